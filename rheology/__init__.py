@@ -0,0 +1,20 @@
+"""
+Strength envelopes and effective viscosity of lithospheric rocks.
+
+The compute core in rheology.lib only needs NumPy and is imported here.
+File handling, process pools and the pipelines live in the submodules
+io, parallel, pipeline, columns, lookup, jit, timing, batch and cache
+and are imported on first use, plotting helpers in plot import
+matplotlib only when called.
+"""
+from .lib import materials, MaterialTable, material_table, MATERIAL_PARAMS
+from .lib import LITMOD_DENSITY_RULES, compile_density_rules
+from .lib import classify_density, effective_viscosity, sigma_byerlee
+from .lib import sigma_diffusion, sigma_dislocation, sigma_dorn
+from .lib import CompiledMaterial, FlowLawContext, log10_effective_viscosity
+from .lib import log10_sigma_dislocation, log10_sigma_diffusion
+from .lib import log10_sigma_dorn, log10_sigma_creep, sigma_creep, sigma_d
+from .lib import yield_strength_envelope, unique_keys, compute_dsigma
+from .lib import compute_mixed, yield_strength_sweep, compare_materials
+
+__version__ = '0.2.0'
@@ -0,0 +1,323 @@
+"""
+Batch runs of many models from a manifest.
+
+A manifest is a JSON file with a list of jobs, or a dict with the list
+under 'jobs' and settings shared by all jobs under 'defaults':
+
+    {"defaults": {"strain_rate": 1e-15, "dedup": true},
+     "jobs": [{"input": "model_a.dat", "material": "peridotite_dry",
+               "output": "a/strength.txt"},
+              {"input": "profile.dat", "rules": "litmod",
+               "strain_rate": 1e-16, "output": "b/strength.dat"}]}
+
+Jobs with 'material' run the V2RhoT pipeline, see run_v2rhot(); jobs with
+'rules' assign materials by density from a LitMod post-processing file,
+see run_litmod(). 'rules' is "litmod" for LITMOD_DENSITY_RULES or a list
+of [name, density] and [name, [lo, hi]] rules, where a null bound is
+open. Further keys are passed on as keyword arguments of the run
+function, see job_options(), e.g. chunksize, engine, passthrough, dedup,
+report and cache, a result cache directory shared by the jobs, see
+rheology.cache. Defaults that the run function of a job does not take,
+e.g. chunksize for 'rules' jobs, are left out for that job. Every job
+runs in one worker process, so a job cannot set workers. Relative paths
+are relative to the manifest.
+
+Every output gets a stamp file next to it, see job_stamp(). A job is
+skipped when its output exists and its stamp matches, so that changing
+the input, the settings of a job, the material parameters or the code
+runs it again.
+"""
+import os
+import json
+import inspect
+import time
+import traceback
+import numpy as np
+from .lib import material_table, LITMOD_DENSITY_RULES
+from .parallel import imap_ordered, worker_table
+from .pipeline import run_v2rhot, run_litmod
+from .cache import ResultCache, file_digest
+
+# Keys of a job that are not passed on to the run function
+JOB_KEYS = ('input', 'output', 'material', 'rules', 'strain_rate')
+# Arguments of the run functions that run_job() sets itself
+RESERVED_ARGS = ('inputfile', 'outputfile', 'rheology_law', 'workers',
+                 'table')
+
+
+def job_options(job):
+    """
+    Names of the options a job may set: the keyword arguments of
+    run_v2rhot() for jobs with a material and of run_litmod() for jobs
+    with rules, without the ones run_job() sets itself.
+    """
+    func = run_v2rhot if 'material' in job else run_litmod
+    return [name for name in inspect.signature(func).parameters
+            if name not in JOB_KEYS + RESERVED_ARGS]
+
+
+def load_manifest(path):
+    """
+    Read the jobs of a manifest, merged with its defaults and with paths
+    made relative to the working directory.
+
+    Returns
+    -------
+    jobs : list of dict
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    defaults = manifest.get('defaults', dict())
+    root = os.path.dirname(os.path.abspath(path))
+    jobs = list()
+    for i, job in enumerate(manifest['jobs']):
+        job = dict(defaults, **job)
+        for key in ('input', 'output', 'strain_rate'):
+            if key not in job:
+                raise ValueError('Job %d has no %s' % (i, key), job)
+        if ('material' in job) == ('rules' in job):
+            raise ValueError('Job %d needs either material or rules' % i,
+                             job)
+        options = job_options(job)
+        for key in defaults:
+            if key not in manifest['jobs'][i] and key not in JOB_KEYS and \
+                    key not in options:
+                del job[key]
+        for key in ('input', 'output', 'cache'):
+            if key in job:
+                job[key] = os.path.join(root, job[key])
+        jobs.append(job)
+    return jobs
+
+
+def parse_rules(rules):
+    """
+    Density rules of a manifest job in the form of LITMOD_DENSITY_RULES.
+    """
+    if rules == 'litmod':
+        return LITMOD_DENSITY_RULES
+    parsed = list()
+    for name, code in rules:
+        if np.ndim(code):
+            lo, hi = code
+            code = (-np.inf if lo is None else float(lo),
+                    np.inf if hi is None else float(hi))
+        else:
+            code = float(code)
+        parsed.append((name, code))
+    return parsed
+
+
+def check_jobs(jobs, table=None):
+    """
+    Fail before any job runs if a job sets an option its run function does
+    not take, a material name is unknown or two jobs write the same
+    output.
+    """
+    if table is None:
+        table = material_table()
+    outputs = set()
+    for i, job in enumerate(jobs):
+        options = job_options(job)
+        unknown = [key for key in job
+                   if key not in JOB_KEYS and key not in options]
+        if unknown:
+            raise ValueError('Job %d sets unknown options' % i, unknown,
+                             'allowed are', options)
+        if 'material' in job:
+            table.index(job['material'])
+        else:
+            for name, code in parse_rules(job['rules']):
+                table.index(name)
+        output = os.path.abspath(job['output'])
+        if output in outputs:
+            raise ValueError('Several jobs write', output)
+        outputs.add(output)
+
+
+def stamp_path(output):
+    """
+    Path of the stamp file of an output.
+    """
+    return str(output) + '.stamp'
+
+
+def job_stamp(job, table=None):
+    """
+    Hash of everything that determines the output of job: the content of
+    the input file, the settings of the job, the parameters of its
+    materials and the code version, see ResultCache.key().
+    """
+    if table is None:
+        table = material_table()
+    if 'material' in job:
+        names = [job['material']]
+    else:
+        names = [name for name, code in parse_rules(job['rules'])]
+    settings = {key: value for key, value in job.items()
+                if key not in ('input', 'output', 'cache')}
+    return ResultCache.key(input=file_digest(job['input']), job=settings,
+                           materials=[table.material(name)
+                                      for name in names])
+
+
+def is_up_to_date(job, table=None, stamp=None):
+    """
+    True if the output of job exists and was written with the stamp of
+    the job, see job_stamp().
+    """
+    try:
+        with open(stamp_path(job['output'])) as f:
+            written = f.read().strip()
+    except OSError:
+        return False
+    if not os.path.exists(job['output']):
+        return False
+    if stamp is None:
+        stamp = job_stamp(job, table)
+    return written == stamp
+
+
+def run_job(job, table=None, stamp=None):
+    """
+    Run one manifest job in this process, creating its output directory,
+    and write the stamp of the job next to the output when it succeeds.
+
+    Parameters
+    ----------
+    job : dict
+        Job, see load_manifest()
+    table : MaterialTable
+        Defaults to material_table().
+    stamp : str
+        job_stamp() of the job if already known
+
+    Returns
+    -------
+    nrows : int
+        Number of rows written
+    """
+    if table is None:
+        table = material_table()
+    if stamp is None:
+        stamp = job_stamp(job, table)
+    if os.path.exists(stamp_path(job['output'])):
+        os.remove(stamp_path(job['output']))
+    outdir = os.path.dirname(job['output'])
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+    options = {key: value for key, value in job.items()
+               if key not in JOB_KEYS}
+    if 'material' in job:
+        nrows, nkeys = run_v2rhot(job['input'], job['output'],
+                                  job['material'], job['strain_rate'],
+                                  workers=1, table=table, **options)
+    else:
+        nrows, unmatched = run_litmod(job['input'], job['output'],
+                                      job['strain_rate'],
+                                      parse_rules(job['rules']),
+                                      workers=1, table=table, **options)
+    with open(stamp_path(job['output']), 'w') as f:
+        f.write(stamp + '\n')
+    return nrows
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _job_task(args):
+    job, stamp = args
+    start = time.perf_counter()
+    result = {'input': job['input'], 'output': job['output']}
+    before = _mtime(job['output'])
+    try:
+        result['rows'] = run_job(job, worker_table(), stamp)
+        result['status'] = 'done'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = ''.join(traceback.format_exception_only(type(e),
+                                                                  e)).strip()
+        # remove a partial output, but not the output of an earlier run
+        # if this one failed before writing
+        written = _mtime(job['output'])
+        if written is not None and written != before:
+            os.remove(job['output'])
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs, workers=None, force=False, table=None):
+    """
+    Run the jobs of a manifest concurrently, one job per worker process.
+    Every worker receives the material table once. A failing job is
+    reported and does not stop the others.
+
+    Parameters
+    ----------
+    jobs : list of dict
+        Jobs, see load_manifest()
+    workers : int
+        Number of worker processes. None uses os.cpu_count().
+    force : bool
+        Also run jobs whose output is up to date, see is_up_to_date()
+    table : MaterialTable
+        Defaults to material_table().
+
+    Yields
+    ------
+    result : dict
+        'input', 'output', 'status' ('done', 'skipped' or 'failed') and,
+        for jobs that ran, 'seconds' and 'rows' or 'error'. Skipped jobs
+        come first, the others follow in job order.
+    """
+    if table is None:
+        table = material_table()
+    check_jobs(jobs, table)
+    todo = list()
+    for job in jobs:
+        try:
+            stamp = job_stamp(job, table)
+        except OSError:
+            # missing input, reported by the job
+            stamp = None
+        if not force and stamp is not None and \
+                is_up_to_date(job, stamp=stamp):
+            yield {'input': job['input'], 'output': job['output'],
+                   'status': 'skipped'}
+        else:
+            todo.append((job, stamp))
+    if todo:
+        workers = min(workers or os.cpu_count(), len(todo))
+        for result in imap_ordered(_job_task, todo, workers, table):
+            yield result
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Run the strength and viscosity jobs of a manifest')
+    parser.add_argument('manifest', help='JSON job list')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes, 0 for all CPU cores')
+    parser.add_argument('--force', action='store_true',
+                        help='also run jobs whose output is up to date')
+    args = parser.parse_args()
+    failed = 0
+    for result in run_batch(load_manifest(args.manifest),
+                            workers=args.workers or None, force=args.force):
+        if result['status'] == 'done':
+            print('done    %s: %d rows in %.1f s' % (
+                result['output'], result['rows'], result['seconds']))
+        elif result['status'] == 'skipped':
+            print('skipped %s: up to date' % result['output'])
+        else:
+            failed += 1
+            print('failed  %s: %s' % (result['output'], result['error']))
+    if failed:
+        raise SystemExit('%d jobs failed' % failed)
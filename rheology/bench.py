@@ -0,0 +1,418 @@
+"""
+Benchmarks of the rheology kernels and pipeline stages on synthetic models.
+
+Run e.g.
+
+    python -m rheology.bench bench.json --sizes 1e3 1e4 1e5 1e6
+    python -m rheology.bench new.json --compare bench.json
+
+and compare the points per second of two runs.
+"""
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from .lib import material_table, sigma_byerlee, sigma_dislocation
+from .lib import sigma_diffusion, sigma_dorn, effective_viscosity
+from .lib import compute_dsigma, compute_mixed, classify_density
+from .lib import LITMOD_DENSITY_RULES
+from .io import load_table, open_writer, parse_text, ENGINES
+from .pipeline import v2rhot_chunk, run_v2rhot, strength_map
+from .pipeline import V2RHOT_USECOLS, V2RHOT_HEADER
+from .pipeline import transition_depths, V2RHOT_FMT
+from .pipeline import litmod_strength, run_litmod, LITMOD_COLUMNS
+from .lookup import StrengthTable
+
+# Default numbers of points
+SIZES = (1e3, 1e4, 1e5, 1e6)
+# Kernels are evaluated repeatedly on blocks of at most this many points,
+# so that sizes up to 1e8 fit in memory
+BLOCK = 1000000
+# Largest model written to disk for the pipeline stages
+MAX_PIPELINE_SIZE = 1000000
+# Samples per synthetic depth profile
+PROFILE_SAMPLES = 200
+
+
+def synthetic_geotherm(depth, lab_depth=120.0, t_lab=1300.0):
+    """
+    Temperature in C at depth in km: linear conductive geotherm down to
+    the lithosphere-asthenosphere boundary at lab_depth, an adiabat of
+    0.4 C/km below.
+    """
+    depth = np.asarray(depth, dtype=float)
+    return np.where(depth < lab_depth, depth*t_lab/lab_depth,
+                    t_lab + 0.4*(depth - lab_depth))
+
+
+def _profiles(n, seed):
+    """
+    Depth (km), temperature (C), density (kg/m3) and profile number of n
+    points on depth profiles of PROFILE_SAMPLES samples down to 400 km,
+    with a lithosphere thickness varying between profiles.
+    """
+    rng = np.random.default_rng(seed)
+    profile = np.arange(n)//PROFILE_SAMPLES
+    depth = (np.arange(n) % PROFILE_SAMPLES)*(400.0/PROFILE_SAMPLES)
+    lab = rng.uniform(80.0, 250.0, profile[-1] + 1 if n else 0)[profile]
+    temp = synthetic_geotherm(depth, lab)
+    # density codes of the LitMod crustal layers, mantle density below
+    density = np.select([depth < 15, depth < 25, depth < 35],
+                        [2750.0, 2850.0, 2950.0],
+                        3300.0 + 0.1*depth)
+    return depth, temp, density, profile
+
+
+def synthetic_litmod(n, seed=0):
+    """
+    LitMod-style post-processing table of n points: depth (km) in column
+    1, temperature (C) in column 2 and density (kg/m3) in column 6.
+    """
+    depth, temp, density, profile = _profiles(n, seed)
+    data = np.zeros((n, 7))
+    data[:, 0] = profile
+    data[:, 1] = depth
+    data[:, 2] = temp
+    data[:, 6] = density
+    return data
+
+
+def synthetic_v2rhot(n, seed=0):
+    """
+    V2RhoT-style table of n points, see rheology.io.V2RHOT_COLUMNS. The
+    depth profiles lie on a square (x, y) grid with 5 km spacing.
+    """
+    depth, temp, density, profile = _profiles(n, seed)
+    side = max(int(np.ceil(np.sqrt(profile[-1] + 1 if n else 0))), 1)
+    data = np.zeros((n, 10))
+    data[:, 0] = 5.0*(profile % side)
+    data[:, 1] = 5.0*(profile//side)
+    data[:, 2] = depth
+    data[:, 3] = 0.33*depth*1e3  # bar
+    data[:, 4] = temp
+    data[:, 5] = density
+    return data
+
+
+def measure(func, repeat=1, memory=True):
+    """
+    Time func() and record the peak memory it allocates.
+
+    The time is the best of repeat calls. The peak is measured in a
+    separate call with tracemalloc, which NumPy reports its array
+    allocations to, so that tracing does not slow down the timed calls.
+
+    Returns
+    -------
+    seconds : float
+        Best wall time
+    peak_bytes : int
+        Peak memory allocated during the call, None without memory
+    """
+    seconds = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def _blocks(n, block):
+    """
+    Sizes of the blocks n points are evaluated in.
+    """
+    sizes = [block]*(n//block)
+    if n % block:
+        sizes.append(n % block)
+    return sizes
+
+
+def kernel_benchmarks(n, material='peridotite_dry', strain_rate=1e-15,
+                      block=BLOCK):
+    """
+    Benchmarks of the flow law kernels for n points, as (name, func)
+    pairs. Inputs of more than block points are evaluated block by block.
+    """
+    table = material_table()
+    mat = table.material(material)
+    data = synthetic_litmod(min(n, block))
+    z, T = data[:, 1]*1e3, data[:, 2] + 273
+    mat_idx = classify_density(data[:, 6], LITMOD_DENSITY_RULES, table)
+    sizes = _blocks(n, block)
+
+    def blockwise(kernel):
+        def run():
+            for size in sizes:
+                kernel(size)
+        return run
+
+    return [
+        ('sigma_byerlee', blockwise(
+            lambda k: sigma_byerlee(mat, z[:k], 'compression'))),
+        ('sigma_dislocation', blockwise(
+            lambda k: sigma_dislocation(mat, T[:k], strain_rate))),
+        ('sigma_diffusion', blockwise(
+            lambda k: sigma_diffusion(mat, T[:k], strain_rate))),
+        ('sigma_dorn', blockwise(
+            lambda k: sigma_dorn(mat, T[:k], strain_rate))),
+        ('effective_viscosity', blockwise(
+            lambda k: effective_viscosity(mat, T[:k], strain_rate))),
+        ('compute_dsigma', blockwise(
+            lambda k: compute_dsigma(mat, z[:k], T[:k], strain_rate))),
+        ('compute_mixed', blockwise(
+            lambda k: compute_mixed(mat_idx[:k], z[:k], T[:k], strain_rate,
+                                    table))),
+    ]
+
+
+def parse_benchmarks(inputfile):
+    """
+    Benchmarks of the text parsers on a V2RhoT file, as (name, func)
+    pairs: np.loadtxt of all columns and every engine of
+    rheology.io.parse_text() reading only depth and temperature. Engines
+    that are not installed are left out.
+    """
+    benchmarks = [('parse_loadtxt', lambda: np.loadtxt(inputfile,
+                                                        delimiter=','))]
+    for engine in ENGINES:
+        try:
+            parse_text(inputfile, usecols=V2RHOT_USECOLS, engine=engine)
+        except ImportError:
+            continue
+        benchmarks.append(('parse_%s_usecols' % engine,
+                           lambda engine=engine: parse_text(
+                               inputfile, usecols=V2RHOT_USECOLS,
+                               engine=engine)))
+    return benchmarks
+
+
+def pipeline_benchmarks(n, tmpdir, material='peridotite_dry',
+                        strain_rate=1e-15):
+    """
+    Benchmarks of the stages of the V2RhoT pipeline for a model of n
+    points written to tmpdir, as (name, func) pairs, in pipeline order,
+    after the parse_benchmarks() of the input.
+    """
+    mat = material_table().material(material)
+    inputfile = os.path.join(tmpdir, 'bench_%d.dat' % n)
+    outputfile = os.path.join(tmpdir, 'bench_%d_out.dat' % n)
+    # with the comment header of V2RhoT files, which the parsers skip
+    np.savetxt(inputfile, synthetic_v2rhot(n), delimiter=',', fmt=V2RHOT_FMT,
+               header=V2RHOT_HEADER[1:])
+    state = dict()
+
+    def load():
+        state['data'] = load_table(inputfile)
+
+    def compute():
+        state['out'] = v2rhot_chunk(state['data'], mat, strain_rate)[0]
+
+    def build_table():
+        state['lookup'] = StrengthTable(mat, strain_rate)
+
+    def compute_lookup():
+        v2rhot_chunk(state['data'], mat, strain_rate, lookup=state['lookup'])
+
+    def write():
+        with open_writer(outputfile, fmt=V2RHOT_FMT) as writer:
+            writer.write(state['out'])
+
+    def reduce_map():
+        out = state['out']
+        strength_map(out[:, 0], out[:, 1], out[:, 2], out[:, 10], out[:, 11])
+
+    def transitions():
+        data = state['data']
+        transition_depths(data[:, 2], data[:, 4], mat, strain_rate,
+                          x=data[:, 0], y=data[:, 1])
+
+    return parse_benchmarks(inputfile) + [
+        ('load_table', load),
+        ('v2rhot_chunk', compute),
+        ('strength_table', build_table),
+        ('v2rhot_chunk_lookup', compute_lookup),
+        ('write_text', write),
+        ('strength_map', reduce_map),
+        ('transition_depths', transitions),
+        ('run_v2rhot', lambda: run_v2rhot(inputfile, outputfile, material,
+                                          strain_rate)),
+    ]
+
+
+def litmod_benchmarks(n, tmpdir, strain_rate=1e-15):
+    """
+    Benchmarks of the stages of the LitMod pipeline for a model of n
+    points written to tmpdir, as (name, func) pairs, in pipeline order.
+    """
+    table = material_table()
+    inputfile = os.path.join(tmpdir, 'litmod_%d.dat' % n)
+    outputfile = os.path.join(tmpdir, 'litmod_%d_out.dat' % n)
+    np.savetxt(inputfile, synthetic_litmod(n), fmt='%10.3f')
+    state = dict()
+
+    def load():
+        state['data'] = load_table(inputfile, delimiter=None)
+
+    def classify():
+        classify_density(state['data'][:, LITMOD_COLUMNS[2]],
+                         LITMOD_DENSITY_RULES, table)
+
+    def compute():
+        state['out'] = litmod_strength(state['data'], strain_rate,
+                                       table=table)[0]
+
+    def write():
+        with open_writer(outputfile, delimiter=' ') as writer:
+            writer.write(state['out'])
+
+    return [
+        ('litmod_load_table', load),
+        ('classify_density', classify),
+        ('litmod_strength', compute),
+        ('litmod_write_text', write),
+        ('run_litmod', lambda: run_litmod(inputfile, outputfile, strain_rate,
+                                          table=table)),
+    ]
+
+
+def parse_speedups(report):
+    """
+    Speedup of every parse benchmark of report over np.loadtxt of all
+    columns at the same size, as (name, points, speedup) tuples.
+    """
+    base = {r['points']: r['seconds'] for r in report['results']
+            if r['name'] == 'parse_loadtxt'}
+    return [(r['name'], r['points'], base[r['points']]/r['seconds'])
+            for r in report['results']
+            if r['name'].startswith('parse_') and r['name'] != 'parse_loadtxt'
+            and r['points'] in base and r['seconds'] > 0]
+
+
+def _record(kind, name, n, seconds, peak):
+    return {'kind': kind, 'name': name, 'points': n, 'seconds': seconds,
+            'points_per_s': n/seconds if seconds > 0 else None,
+            'peak_bytes': peak}
+
+
+def run_benchmarks(sizes=SIZES, repeat=3, memory=True, kernels=True,
+                   pipeline=True, max_pipeline_size=MAX_PIPELINE_SIZE,
+                   block=BLOCK, verbose=True):
+    """
+    Run the kernel and pipeline benchmarks for every number of points in
+    sizes.
+
+    Parameters
+    ----------
+    sizes : sequence of int
+        Numbers of points
+    repeat : int
+        Number of timed calls, the best one is reported
+    memory : bool
+        Measure the peak memory of every benchmark
+    kernels, pipeline : bool
+        Run the kernel and the pipeline benchmarks
+    max_pipeline_size : int
+        Pipeline stages are skipped for larger sizes, their input is
+        written to disk as text
+    block : int
+        Block size of the kernel benchmarks
+    verbose : bool
+        Print every result
+
+    Returns
+    -------
+    report : dict
+        Description of the machine and list of 'results', each with the
+        kind ('kernel' or 'stage'), name, points, seconds, points_per_s and
+        peak_bytes
+    """
+    results = list()
+
+    def run(kind, n, benchmarks):
+        for name, func in benchmarks:
+            seconds, peak = measure(func, repeat, memory)
+            results.append(_record(kind, name, n, seconds, peak))
+            if verbose:
+                print('%-8s %-22s %10d points %10.4f s %12.4g points/s%s'
+                      % (kind, name, n, seconds, n/seconds,
+                         '' if peak is None else
+                         ' %8.1f MB' % (peak/2**20)))
+
+    for n in sizes:
+        n = int(n)
+        if kernels:
+            run('kernel', n, kernel_benchmarks(n, block=block))
+        if pipeline and n <= max_pipeline_size:
+            tmpdir = tempfile.mkdtemp(prefix='rheology_bench_')
+            try:
+                run('stage', n, pipeline_benchmarks(n, tmpdir))
+                run('stage', n, litmod_benchmarks(n, tmpdir))
+            finally:
+                shutil.rmtree(tmpdir)
+    return {'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'results': results}
+
+
+def compare(report, baseline):
+    """
+    Speedup of every result of report over the same benchmark in
+    baseline, as (kind, name, points, speedup) tuples.
+    """
+    base = {(r['kind'], r['name'], r['points']): r['seconds']
+            for r in baseline['results']}
+    return [(r['kind'], r['name'], r['points'],
+             base[(r['kind'], r['name'], r['points'])]/r['seconds'])
+            for r in report['results']
+            if (r['kind'], r['name'], r['points']) in base
+            and r['seconds'] > 0]
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmark the rheology kernels and pipeline stages')
+    parser.add_argument('outputfile', help='JSON report')
+    parser.add_argument('--sizes', type=float, nargs='+', default=SIZES,
+                        help='numbers of points, up to 1e8')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the peak memory measurement')
+    parser.add_argument('--kernels-only', action='store_true')
+    parser.add_argument('--max-pipeline-size', type=float,
+                        default=MAX_PIPELINE_SIZE)
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='JSON report of an earlier run')
+    args = parser.parse_args()
+    report = run_benchmarks(args.sizes, repeat=args.repeat,
+                            memory=not args.no_memory,
+                            pipeline=not args.kernels_only,
+                            max_pipeline_size=args.max_pipeline_size)
+    with open(args.outputfile, 'w') as f:
+        json.dump(report, f, indent=1)
+    for name, n, speedup in parse_speedups(report):
+        print('%-22s %10d points speedup over loadtxt %6.2f' % (name, n,
+                                                                 speedup))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for kind, name, n, speedup in compare(report, baseline):
+            print('%-8s %-22s %10d points speedup %6.2f' % (kind, name, n,
+                                                              speedup))
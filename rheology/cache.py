@@ -0,0 +1,200 @@
+"""
+Content-addressed on-disk cache of computed result columns.
+"""
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+from .io import NpyWriter
+
+# Default location and size budget of the cache
+CACHE_DIR = os.environ.get('RHEOLOGY_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache',
+                                        'rheology'))
+CACHE_BUDGET = 4*2**30 # bytes
+
+_CODE_VERSION = None
+
+
+def code_version():
+    """
+    Version of the computation: the package version and a hash of the
+    sources of the package, so that any change of the code invalidates
+    cached results.
+    """
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        from . import __version__
+        sha = hashlib.sha256(__version__.encode())
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__),
+                                                  '*.py'))):
+            with open(path, 'rb') as f:
+                sha.update(f.read())
+        _CODE_VERSION = __version__ + '+' + sha.hexdigest()[:16]
+    return _CODE_VERSION
+
+
+def file_digest(path, blocksize=2**20):
+    """
+    SHA-256 of the content of a file, read in blocks.
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _canonical(value):
+    """
+    JSON-serialisable form of value that is equal for equal values.
+    Floats are written with repr so that no digit is lost.
+    """
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value))
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+class ResultCache(object):
+    """
+    Result arrays stored as .npy files under a key hashed from everything
+    that determines them. Entries are written atomically, so concurrent
+    runs can share a cache. When the total size exceeds the budget, the
+    least recently used entries are deleted; reading an entry marks it as
+    used.
+
+    Parameters
+    ----------
+    directory : str
+        Cache directory, created if needed. Default is CACHE_DIR, set by
+        the environment variable RHEOLOGY_CACHE.
+    budget : int
+        Maximum total size of the entries in bytes
+
+    Examples
+    --------
+    >>> cache = ResultCache()
+    >>> key = cache.key(input=file_digest(inputfile),
+    ...                 material=table.material('olivine'),
+    ...                 strain_rate=1e-15)
+    >>> result = cache.get(key)
+    >>> if result is None:
+    ...     result = compute()
+    ...     cache.put(key, result)
+    """
+    def __init__(self, directory=None, budget=CACHE_BUDGET):
+        self.directory = CACHE_DIR if directory is None else directory
+        self.budget = budget
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(**parts):
+        """
+        Hash of the keyword arguments and of code_version().
+        """
+        parts['code_version'] = code_version()
+        text = json.dumps(_canonical(parts), sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.npy')
+
+    def get(self, key):
+        """
+        The array stored under key, memory-mapped read-only, or None.
+        """
+        path = self.path(key)
+        try:
+            result = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """
+        Store the array result under key.
+        """
+        with self.writer(key) as writer:
+            writer.write(np.asarray(result).reshape(len(result), -1))
+
+    def writer(self, key):
+        """
+        Store a 2D array under key block by block, see
+        rheology.io.NpyWriter. The entry appears when the writer is closed
+        without an error.
+        """
+        return _CacheWriter(self, key)
+
+    def entries(self):
+        """
+        (path, size, last use) of every entry.
+        """
+        entries = list()
+        for path in glob.glob(os.path.join(self.directory, '*', '*.npy')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def size(self):
+        """
+        Total size of the entries in bytes.
+        """
+        return sum(size for path, size, used in self.entries())
+
+    def evict(self, budget=None):
+        """
+        Delete the least recently used entries until the total size is
+        within budget, by default the budget of the cache.
+
+        Returns
+        -------
+        freed : int
+            Number of bytes deleted
+        """
+        if budget is None:
+            budget = self.budget
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for path, size, used in entries)
+        freed = 0
+        for path, size, used in entries:
+            if total - freed <= budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            freed += size
+        return freed
+
+    def clear(self):
+        """
+        Delete all entries.
+        """
+        return self.evict(0)
+
+
+class _CacheWriter(NpyWriter):
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.final = cache.path(key)
+        os.makedirs(os.path.dirname(self.final), exist_ok=True)
+        NpyWriter.__init__(self, '%s.%d.tmp' % (self.final, os.getpid()))
+
+    def __exit__(self, exc_type, *exc):
+        self.close()
+        if exc_type is None:
+            os.replace(self.path, self.final)
+            self.cache.evict()
+        else:
+            os.remove(self.path)
@@ -0,0 +1,308 @@
+"""
+Reductions over the vertical (x, y) columns of 3D models.
+"""
+import numpy as np
+
+
+def _trapz_segments(values, depth, starts):
+    """
+    Integrate values over depth with the trapezoidal rule, separately for
+    the segments of rows beginning at starts. Rows must be sorted by
+    depth within each segment.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array with one row per sample, further axes are integrated
+        independently
+    depth : np.ndarray
+        1D array of sample depths
+    starts : np.ndarray
+        Index of the first row of every segment, increasing and starting
+        at 0
+
+    Returns
+    -------
+    integral : np.ndarray
+        One row per segment
+    """
+    values = np.asarray(values, dtype=float)
+    if len(starts) == 0:
+        return np.empty((0,) + values.shape[1:])
+    dz = np.diff(depth).reshape((-1,) + (1,)*(values.ndim - 1))
+    # area between every row and the next one, zero after the last row
+    # of each segment
+    area = np.zeros(values.shape)
+    area[:-1] = 0.5*(values[1:] + values[:-1])*dz
+    area[starts[1:] - 1] = 0.0
+    return np.add.reduceat(area, starts, axis=0)
+
+
+class Columns(object):
+    """
+    Rows of a model grouped into vertical columns of equal (x, y) and
+    sorted by depth. The grouping is done once with a single sort, and
+    reductions over all columns are then vectorized over the sorted rows.
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Horizontal coordinates of every row. None for a single 1D profile.
+    depth : np.ndarray
+        Depth of every row
+
+    Attributes
+    ----------
+    order : np.ndarray
+        Row indices sorting the input by column and depth
+    starts : np.ndarray
+        Index of the first sorted row of every column
+    column : np.ndarray
+        Column index of every sorted row
+    depth : np.ndarray
+        Sorted depths
+    x, y : np.ndarray
+        Coordinates of the columns
+
+    Examples
+    --------
+    >>> cols = Columns(data[:, 0], data[:, 1], data[:, 2]*1e3)
+    >>> strength_c, strength_e = cols.integrate(
+    ...     np.column_stack((dsigma_c, dsigma_e))).T
+    """
+    def __init__(self, x, y, depth):
+        depth = np.asarray(depth, dtype=float).ravel()
+        if x is None or y is None:
+            x = y = np.zeros(len(depth))
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if not len(x) == len(y) == len(depth):
+            raise ValueError('x, y and depth differ in length',
+                             (len(x), len(y), len(depth)))
+        self.order = np.lexsort((depth, y, x))
+        x, y = x[self.order], y[self.order]
+        new = np.ones(len(depth), dtype=bool)
+        new[1:] = (x[1:] != x[:-1]) | (y[1:] != y[:-1])
+        self.starts = np.flatnonzero(new)
+        self.column = np.cumsum(new) - 1
+        self.depth = depth[self.order]
+        self.x = x[self.starts]
+        self.y = y[self.starts]
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def nrows(self):
+        return len(self.depth)
+
+    def sort(self, values):
+        """
+        Reorder the rows of values, given in input order, like the sorted
+        depths.
+        """
+        values = np.asarray(values)
+        if len(values) != self.nrows:
+            raise ValueError('Expected', self.nrows, 'rows. Got', len(values))
+        return values[self.order]
+
+    def integrate(self, values):
+        """
+        Integrate values over depth in every column with the trapezoidal
+        rule. Columns with a single row integrate to 0.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            Array with one row per input row, e.g. the differential stress
+            in Pa, in input order. Further axes are integrated
+            independently.
+
+        Returns
+        -------
+        integral : np.ndarray
+            One row per column, in units of values times depth
+        """
+        return _trapz_segments(self.sort(values), self.depth, self.starts)
+
+    def crossings(self, a, b):
+        """
+        Find the depths where the curves a and b cross in every column,
+        e.g. Byerlee's law and the creep stress. Crossings are
+        interpolated linearly between neighbouring samples; a column may
+        have any number of them. Samples where a or b is NaN are skipped.
+
+        Parameters
+        ----------
+        a, b : np.ndarray
+            Values of both curves for every input row, in input order
+
+        Returns
+        -------
+        column : np.ndarray
+            Column index of every crossing, increasing
+        depth : np.ndarray
+            Depth of every crossing, increasing within a column
+        direction : np.ndarray
+            1 where a - b turns from negative above to positive below the
+            crossing, -1 for the opposite
+        """
+        diff = self.sort(np.asarray(a, dtype=float) - b)
+        valid = ~np.isnan(diff)
+        diff, depth, column = diff[valid], self.depth[valid], \
+            self.column[valid]
+        # a sample with a == b counts as positive, so that a touching
+        # point between negative samples gives two crossings at it and a
+        # crossing through it gives one
+        negative = diff < 0
+        i = np.flatnonzero((negative[1:] != negative[:-1])
+                           & (column[1:] == column[:-1]))
+        w = diff[i]/(diff[i] - diff[i + 1])
+        return (column[i], depth[i] + w*(depth[i + 1] - depth[i]),
+                np.where(negative[i], 1, -1))
+
+
+# Elastic constants of the lithosphere
+YOUNG_MODULUS = 8e10 # Pa
+POISSON_RATIO = 0.25
+
+
+def _bending_stress(dz, stress_gradient, s_pos, s_neg):
+    """
+    Fibre stress of a bent layer at distance dz below its neutral plane:
+    elastic, limited by the strength s_pos where positive and by s_neg
+    where negative.
+    """
+    stress = stress_gradient*dz
+    return np.where(stress > 0, np.fmin(stress, s_pos),
+                    np.fmax(stress, -s_neg))
+
+
+def _layer_moments(depth, layer, starts, stress_gradient, s_pos, s_neg,
+                   iterations):
+    """
+    Bending moment of every layer for the given elastic stress gradient
+    (E/(1-nu^2) times curvature) per layer. The neutral plane of each
+    layer is found by bisection so that the net horizontal force
+    vanishes; the force decreases monotonically as the plane deepens.
+    """
+    lo = depth[starts]
+    hi = depth[np.append(starts[1:], len(depth)) - 1]
+    gradient = stress_gradient[layer]
+    for _ in range(iterations):
+        neutral = 0.5*(lo + hi)
+        force = _trapz_segments(
+            _bending_stress(depth - neutral[layer], gradient, s_pos, s_neg),
+            depth, starts)
+        deeper = force > 0
+        lo = np.where(deeper, neutral, lo)
+        hi = np.where(deeper, hi, neutral)
+    dz = depth - (0.5*(lo + hi))[layer]
+    return _trapz_segments(_bending_stress(dz, gradient, s_pos, s_neg)*dz,
+                           depth, starts)
+
+
+def elastic_thickness(columns, dsigma_c, dsigma_e, curvature=None,
+                      moment=None, coupled=False, sigma_min=10e6,
+                      young_modulus=YOUNG_MODULUS,
+                      poisson_ratio=POISSON_RATIO, iterations=50):
+    """
+    Effective elastic thickness Te of every column from its strength
+    envelopes, after Burov & Diament (1995).
+
+    Each column is split into mechanically competent layers where the
+    strength exceeds sigma_min, separated by weak decoupling zones. Every
+    layer bends around its own neutral plane; the fibre stress is elastic
+    and limited by the envelope. Te_i of a layer is the thickness of the
+    elastic plate carrying the same bending moment M_i at the same
+    curvature K, Te_i**3 = 12*M_i*(1-nu**2)/(E*K). Decoupled layers
+    combine as Te = (sum Te_i**3)**(1/3), welded layers as Te = sum Te_i.
+
+    Parameters
+    ----------
+    columns : Columns
+        Columns of the model, depth in m
+    dsigma_c, dsigma_e : np.ndarray
+        Differential stress in compression (negative) and extension
+        (positive) in Pa for every row, in input order
+    curvature : float or np.ndarray
+        Plate curvature in 1/m, per column or for all. Positive curvature
+        extends the lower part of every layer.
+    moment : float or np.ndarray
+        Bending moment in N, per column or for all. Instead of curvature,
+        the curvature carrying this moment is found by bisection; columns
+        too weak to carry it get NaN.
+    coupled : bool
+        Treat the competent layers of a column as welded together
+    sigma_min : float
+        Strength in Pa below which a row is part of a decoupling zone
+    young_modulus : float
+        Young's modulus E in Pa
+    poisson_ratio : float
+        Poisson's ratio nu
+    iterations : int
+        Number of bisection steps
+
+    Returns
+    -------
+    te : np.ndarray
+        Effective elastic thickness in m of every column
+    """
+    if (curvature is None) == (moment is None):
+        raise ValueError('Give either curvature or moment',
+                         (curvature, moment))
+    young = young_modulus/(1 - poisson_ratio**2)
+    s_c = np.abs(columns.sort(dsigma_c).astype(float))
+    s_e = columns.sort(dsigma_e).astype(float)
+    with np.errstate(invalid='ignore'):
+        rows = np.flatnonzero(np.fmin(s_c, s_e) > sigma_min)
+    column = columns.column[rows]
+    new = np.ones(len(rows), dtype=bool)
+    new[1:] = (rows[1:] != rows[:-1] + 1) | (column[1:] != column[:-1])
+    starts = np.flatnonzero(new)
+    layer = np.cumsum(new) - 1
+    layer_column = column[starts]
+    depth, s_c, s_e = columns.depth[rows], s_c[rows], s_e[rows]
+
+    def column_moments(curv):
+        # bending moment of every layer and of every column at curvature
+        # curv per column
+        curv = np.broadcast_to(curv, (len(columns),))[layer_column]
+        extended = (curv >= 0)[layer]
+        m = _layer_moments(depth, layer, starts, young*np.abs(curv),
+                           np.where(extended, s_e, s_c),
+                           np.where(extended, s_c, s_e), iterations)
+        return m, np.bincount(layer_column, m, minlength=len(columns))
+
+    if moment is None:
+        curvature = np.broadcast_to(np.asarray(curvature, dtype=float),
+                                    (len(columns),))
+    else:
+        moment = np.broadcast_to(np.asarray(moment, dtype=float),
+                                 (len(columns),))
+        # bisection of log10 of the curvature between 1e-12 and 1e-3 1/m,
+        # the moment increases monotonically with curvature. The sign of
+        # the moment selects which envelope limits the extended fibres.
+        lo = np.full(len(columns), -12.0)
+        hi = np.full(len(columns), -3.0)
+        for _ in range(iterations):
+            mid = 0.5*(lo + hi)
+            larger = column_moments(np.copysign(10**mid, moment))[1] \
+                < np.abs(moment)
+            lo = np.where(larger, mid, lo)
+            hi = np.where(larger, hi, mid)
+        curvature = np.copysign(10**(0.5*(lo + hi)), moment)
+        weak = column_moments(np.copysign(10**hi, moment))[1] \
+            < np.abs(moment)
+    m = column_moments(curvature)[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        te = np.cbrt(12*m/(young*np.abs(curvature[layer_column])))
+    te = np.where(m > 0, te, 0.0)
+    if coupled:
+        te = np.bincount(layer_column, te, minlength=len(columns))
+    else:
+        te = np.cbrt(np.bincount(layer_column, te**3,
+                                 minlength=len(columns)))
+    if moment is not None:
+        te[weak] = np.nan
+    return te
@@ -0,0 +1,431 @@
+"""
+Reading and writing of rheology model files.
+"""
+import io
+import os
+import struct
+import numpy as np
+from itertools import islice
+
+# Fixed length of the .npy header written by NpyWriter, leaves room for any
+# row count so that the header can be completed in place
+NPY_HEADER_LEN = 128
+
+
+# Columns of the comma separated V2RhoT input files
+V2RHOT_COLUMNS = ('x', 'y', 'depth', 'pressure', 'temperature', 'density',
+                  'vp', 'vs', 'vs_diff', 'melt')
+
+# Text parsers. numpy's loadtxt is the default and always available,
+# pyarrow is optional and parses with several threads. Which one is faster
+# depends on the machine, see the parse benchmarks in rheology.bench.
+ENGINES = ('numpy', 'pyarrow')
+
+
+def _pick_engine(engine, delimiter):
+    if engine is None:
+        return 'numpy'
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine', engine)
+    # pyarrow has no whitespace delimited mode
+    if engine == 'pyarrow' and delimiter is None:
+        return 'numpy'
+    return engine
+
+
+def _leading_comment_lines(lines, comments):
+    """
+    Number of comment and empty lines at the top of an iterable of lines.
+    """
+    n = 0
+    for line in lines:
+        if line.strip() and not line.lstrip().startswith(comments):
+            break
+        n += 1
+    return n
+
+
+def parse_text(source, usecols=None, delimiter=',', comments='#',
+               engine=None):
+    """
+    Parse delimited numerical text into a 2D float array, optionally only
+    selected columns. Unselected columns are skipped by the parser without
+    being converted.
+
+    Parameters
+    ----------
+    source : str or bytes
+        Path to a text file, or the raw bytes of data lines
+    usecols : sequence of int
+        Column indices to return, in this order. Default is all columns.
+    delimiter : str
+        Column delimiter, None for whitespace
+    comments : str
+        Comment character
+    engine : str
+        One of ENGINES, default 'numpy'. Both engines give the same
+        result. pyarrow skips the comment lines at the top and falls back
+        to numpy for whitespace delimited text and for comments further
+        down.
+
+    Returns
+    -------
+    data : np.ndarray
+        2D array with one row per data line
+    """
+    engine = _pick_engine(engine, delimiter)
+    if isinstance(source, bytes) and not source.strip():
+        return np.empty((0, 0 if usecols is None else len(usecols)))
+    if engine == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        if isinstance(source, bytes):
+            src = io.BytesIO(source)
+            skip = _leading_comment_lines(src, comments.encode())
+            src.seek(0)
+        else:
+            src = source
+            with open(source, 'rb') as f:
+                skip = _leading_comment_lines(f, comments.encode())
+        include = None if usecols is None else ['f%d' % i for i in usecols]
+        try:
+            table = pa_csv.read_csv(
+                src,
+                read_options=pa_csv.ReadOptions(
+                    skip_rows=skip, autogenerate_column_names=True),
+                parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=include))
+        except pa.ArrowInvalid:
+            table = None
+        # comment lines inside the data break the rows, comments after
+        # the values of a line turn columns into strings; only loadtxt
+        # skips them
+        if table is not None and all(pa.types.is_integer(col.type) or
+                                     pa.types.is_floating(col.type)
+                                     for col in table.columns):
+            return np.column_stack([col.to_numpy() for col in table.columns]
+                                   ).astype(float, copy=False)
+    if isinstance(source, bytes):
+        source = source.decode().splitlines()
+    return np.loadtxt(source, delimiter=delimiter, comments=comments,
+                      usecols=usecols, ndmin=2)
+
+
+def iter_raw_lines(inputfile, chunksize=None, comments='#'):
+    """
+    Read the data lines of a text file in blocks, skipping comment and
+    empty lines. The lines are returned unparsed.
+
+    Parameters
+    ----------
+    inputfile : str
+        Path to the text file
+    chunksize : int
+        Maximum number of lines per block. None returns all lines in one
+        block.
+    comments : str
+        Comment character
+
+    Yields
+    ------
+    raw : bytes
+        The data lines of the next block including line endings
+    """
+    if chunksize is not None and chunksize < 1:
+        raise ValueError('chunksize must be positive. Got', chunksize)
+    comments = comments.encode()
+    with open(inputfile, 'rb') as f:
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                break
+            lines = [line for line in lines
+                     if line.strip() and
+                     not line.lstrip().startswith(comments)]
+            if lines:
+                yield b''.join(lines)
+
+
+def iter_chunks(inputfile, chunksize, delimiter=',', comments='#',
+                usecols=None, engine=None):
+    """
+    Read a delimited text file block by block. Only one block of lines is
+    held in memory at a time.
+
+    Parameters
+    ----------
+    inputfile : str
+        Path to the text file
+    chunksize : int
+        Maximum number of lines parsed per block
+    delimiter : str
+        Column delimiter, None for whitespace
+    comments : str
+        Comment character
+    usecols : sequence of int
+        Columns to parse, see parse_text()
+    engine : str
+        Text parser, see parse_text()
+
+    Yields
+    ------
+    chunk : np.ndarray
+        2D array with the data rows of the next block
+    """
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive. Got', chunksize)
+    for raw in iter_raw_lines(inputfile, chunksize, comments=comments):
+        yield parse_text(raw, usecols=usecols, delimiter=delimiter,
+                         comments=comments, engine=engine)
+
+
+def is_npy(path):
+    """
+    True if path names a binary .npy file.
+    """
+    return os.path.splitext(str(path))[1].lower() == '.npy'
+
+
+def load_table(path, delimiter=',', comments='#', usecols=None,
+               engine=None):
+    """
+    Load a whole model file. Binary .npy files are memory-mapped read-only
+    instead of being read, text files are parsed with parse_text().
+
+    Parameters
+    ----------
+    path : str
+        .npy file or delimited text file
+    delimiter : str
+        Column delimiter of text files, None for whitespace
+    comments : str
+        Comment character of text files
+    usecols : sequence of int
+        Columns to load. Default is all columns.
+    engine : str
+        Text parser, see parse_text()
+
+    Returns
+    -------
+    data : np.ndarray or np.memmap
+        2D array with one row per point
+    """
+    if is_npy(path):
+        data = np.load(path, mmap_mode='r')
+        if usecols is not None:
+            data = data[:, list(usecols)]
+        return data
+    return parse_text(path, usecols=usecols, delimiter=delimiter,
+                      comments=comments, engine=engine)
+
+
+def read_blocks(path, chunksize=None, delimiter=',', comments='#',
+                usecols=None, engine=None):
+    """
+    Iterate over a model file in blocks of at most chunksize rows, see
+    iter_chunks(). Blocks of .npy files are sliced from a memory map. With
+    chunksize None the whole file is yielded as one block.
+
+    Yields
+    ------
+    block : np.ndarray
+        2D array with the rows of the next block
+    """
+    if chunksize is None:
+        yield load_table(path, delimiter=delimiter, comments=comments,
+                         usecols=usecols, engine=engine)
+    elif is_npy(path):
+        data = np.load(path, mmap_mode='r')
+        for i in range(0, len(data), chunksize):
+            block = data[i:i+chunksize]
+            if usecols is not None:
+                block = block[:, list(usecols)]
+            yield np.asarray(block)
+    else:
+        for chunk in iter_chunks(path, chunksize, delimiter=delimiter,
+                                 comments=comments, usecols=usecols,
+                                 engine=engine):
+            yield chunk
+
+
+def read_columns(path, columns, schema=V2RHOT_COLUMNS, delimiter=',',
+                 comments='#', engine=None):
+    """
+    Load only the named columns of a model file.
+
+    Parameters
+    ----------
+    path : str
+        .npy file or delimited text file
+    columns : sequence of str
+        Column names, e.g. ('depth', 'temperature')
+    schema : sequence of str
+        Names of all columns of the file. Default is V2RHOT_COLUMNS.
+
+    Returns
+    -------
+    data : dict
+        1D array per column name
+    """
+    usecols = [schema.index(name) for name in columns]
+    data = load_table(path, delimiter=delimiter, comments=comments,
+                      usecols=usecols, engine=engine)
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+class NpyWriter(object):
+    """
+    Write a 2D array to a .npy file block by block, without knowing the
+    final number of rows in advance. The header is written with a fixed
+    length of NPY_HEADER_LEN bytes and completed on close(). The result is
+    a standard .npy file that can be memory-mapped with
+    np.load(path, mmap_mode='r').
+
+    Parameters
+    ----------
+    path : str
+        Output file
+    dtype : np.dtype
+        Data type of the stored values. Default is float64.
+    """
+    def __init__(self, path, dtype=float):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.nrows = 0
+        self.ncols = None
+        self._f = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        if self.ncols is None:
+            shape = (self.nrows,)
+        else:
+            shape = (self.nrows, self.ncols)
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype),
+                       'fortran_order': False,
+                       'shape': shape}).encode('latin1')
+        # magic string, version 1.0, header length, header, newline
+        pad = NPY_HEADER_LEN - 10 - len(header) - 1
+        header = header + b' '*pad + b'\n'
+        self._f.seek(0)
+        self._f.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header))
+                      + header)
+
+    def write(self, block):
+        """
+        Append the rows of the 2D array block.
+        """
+        block = np.ascontiguousarray(block, dtype=self.dtype)
+        if block.ndim != 2:
+            raise ValueError('Expected a 2D block. Got shape', block.shape)
+        if self.ncols is None:
+            self.ncols = block.shape[1]
+        elif block.shape[1] != self.ncols:
+            raise ValueError('Expected', self.ncols, 'columns. Got',
+                             block.shape[1])
+        self._f.seek(0, os.SEEK_END)
+        self._f.write(block.tobytes())
+        self.nrows += len(block)
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._write_header()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextWriter(object):
+    """
+    Write a 2D array to a delimited text file block by block. The output
+    is the same as a single np.savetxt() call on the concatenated blocks.
+
+    Parameters
+    ----------
+    path : str
+        Output file
+    header : str
+        Column header, written after comments
+    comments : str
+        Written in front of the header
+    delimiter : str
+        Column delimiter
+    fmt : str
+        Number format, see np.savetxt()
+    """
+    def __init__(self, path, header='', comments='# ', delimiter=',',
+                 fmt='%.18e'):
+        self.path = path
+        self.delimiter = delimiter
+        self.fmt = fmt
+        self.nrows = 0
+        self._f = open(path, 'w')
+        if header:
+            self._f.write(comments + header + '\n')
+
+    def write(self, block):
+        """
+        Append the rows of the 2D array block.
+        """
+        np.savetxt(self._f, block, delimiter=self.delimiter, fmt=self.fmt)
+        self.nrows += len(block)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path, header='', comments='# ', delimiter=',', fmt='%.18e'):
+    """
+    Return a NpyWriter for .npy paths and a TextWriter otherwise. Header,
+    comments, delimiter and fmt only apply to text output.
+    """
+    if is_npy(path):
+        return NpyWriter(path)
+    return TextWriter(path, header=header, comments=comments,
+                      delimiter=delimiter, fmt=fmt)
+
+
+def text_to_npy(inputfile, outputfile, chunksize=1000000, delimiter=',',
+                comments='#'):
+    """
+    Convert a delimited text model file, e.g. a V2RhoT input, to a binary
+    .npy file without holding more than chunksize rows in memory.
+
+    Returns
+    -------
+    nrows : int
+        Number of converted rows
+    """
+    with NpyWriter(outputfile) as writer:
+        for chunk in iter_chunks(inputfile, chunksize, delimiter=delimiter,
+                                 comments=comments):
+            writer.write(chunk)
+    return writer.nrows
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Convert a delimited text model file to binary .npy')
+    parser.add_argument('inputfile')
+    parser.add_argument('outputfile')
+    parser.add_argument('--delimiter', default=',',
+                        help="column delimiter, 'none' for whitespace")
+    parser.add_argument('--chunksize', type=int, default=1000000)
+    args = parser.parse_args()
+    delimiter = None if args.delimiter.lower() == 'none' else args.delimiter
+    nrows = text_to_npy(args.inputfile, args.outputfile, args.chunksize,
+                        delimiter=delimiter)
+    print('Wrote', nrows, 'rows to', args.outputfile)
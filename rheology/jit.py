@@ -0,0 +1,134 @@
+"""
+Fused strength and viscosity kernel compiled with Numba.
+
+Numba is optional. Without it compute_fused() falls back to
+rheology.lib.compute_mixed(), which gives the same results.
+"""
+import numpy as np
+from .lib import material_table, compute_mixed, _check_compute
+from .lib import _check_depth, LN_10
+
+try:
+    import numba
+    prange = numba.prange
+except ImportError:
+    numba = None
+    prange = range
+
+# Kernel implementations in order of preference
+BACKENDS = ('numba', 'numpy')
+
+
+def _pick_backend(backend):
+    if backend is None:
+        return 'numpy' if numba is None else 'numba'
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend', backend)
+    if backend == 'numba' and numba is None:
+        raise ImportError('The numba backend requires numba')
+    return backend
+
+
+def _fused_kernel(mat_idx, z, T, log_rate, strain_rate, f_f_c, f_f_e, f_p,
+                  rho_b, log_eta_0, eta_exp, inv_n, log_a_p_n, q_p_n,
+                  log_b_f, q_f, sigma_d, q_d, a_d, no_dorn, do_disloc,
+                  do_dorn, do_diff, log_viscosity, s_d_c, s_d_e, eff_vis):
+    """
+    One pass over all points computing the envelopes and viscosity of
+    compute_mixed() without intermediate arrays. Material parameters are
+    the arrays of a compiled MaterialTable, indexed per point.
+    """
+    R = 8.314472 # m2kg/s2/K/mol
+    g = 9.81  # m/s2
+    log_switch = np.log10(200e6)
+    for i in prange(len(z)):
+        k = mat_idx[i]
+        if k < 0:
+            s_d_c[i] = np.nan
+            s_d_e[i] = np.nan
+            eff_vis[i] = np.nan
+            continue
+        rt = R*T[i]
+        arrhenius_p = q_p_n[k]*(1.0/rt)
+        creep = np.nan
+        if do_disloc:
+            creep = inv_n[k]*log_rate - log_a_p_n[k] + arrhenius_p
+        if do_dorn and not no_dorn[k]:
+            dorn = sigma_d[k]*(1.0 - np.sqrt(-1.0*np.log(strain_rate/a_d[k])
+                                             / q_d[k]*rt))
+            if creep > log_switch and dorn > 0.0:
+                creep = np.log10(dorn)
+        if do_diff:
+            diff = log_b_f[k] + log_rate + q_f[k]*(1.0/rt)
+            if np.isnan(creep) or diff < creep:
+                creep = diff
+        s_creep = np.exp(LN_10*creep)
+        # Byerlee's law and np.fmin, which ignores NaN
+        s_b = f_f_c[k]*rho_b[k]*g*z[i]*(1.0 - f_p[k])
+        s_d_c[i] = -1*(s_b if np.isnan(s_creep) or s_b < s_creep
+                       else s_creep)
+        s_b = f_f_e[k]*rho_b[k]*g*z[i]*(1.0 - f_p[k])
+        s_d_e[i] = s_b if np.isnan(s_creep) or s_b < s_creep else s_creep
+        vis = log_eta_0[k] + eta_exp[k]*log_rate + arrhenius_p
+        eff_vis[i] = vis if log_viscosity else np.exp(LN_10*vis)
+
+
+if numba is not None:
+    _fused_kernel_jit = numba.njit(parallel=True, error_model='numpy',
+                                   cache=True)(_fused_kernel)
+
+
+def compute_fused(mat_idx, z, T, strain_rate, table=None, compute=None,
+                  log_viscosity=False, backend=None):
+    """
+    Same as rheology.lib.compute_mixed(), evaluated by one compiled loop
+    over all points that runs in parallel threads and writes the results
+    directly, without the temporary arrays of the NumPy implementation.
+
+    Parameters
+    ----------
+    mat_idx, z, T, strain_rate, table, compute, log_viscosity
+        See compute_mixed(). strain_rate must be a scalar.
+    backend : str
+        One of BACKENDS. None uses numba if it is installed and NumPy
+        otherwise.
+
+    Returns
+    -------
+    s_d_c, s_d_e, eff_vis : np.ndarray
+        See compute_mixed()
+    """
+    backend = _pick_backend(backend)
+    if backend == 'numpy':
+        return compute_mixed(mat_idx, z, T, strain_rate, table=table,
+                             compute=compute, log_viscosity=log_viscosity)
+    return _run_fused(_fused_kernel_jit, mat_idx, z, T, strain_rate, table,
+                      compute, log_viscosity)
+
+
+def _run_fused(kernel, mat_idx, z, T, strain_rate, table=None, compute=None,
+               log_viscosity=False):
+    """
+    Call kernel, _fused_kernel() or its compiled version, with the
+    arguments of compute_fused() and return its results.
+    """
+    if table is None:
+        table = material_table()
+    compute = _check_compute(compute)
+    mat_idx, z, T = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(mat_idx, dtype=np.intp)),
+        np.atleast_1d(_check_depth(z)),
+        np.atleast_1d(np.asarray(T, dtype=float)))
+    mat = table.compiled()
+    s_d_c = np.empty(z.shape)
+    s_d_e = np.empty(z.shape)
+    eff_vis = np.empty(z.shape)
+    kernel(
+        np.ascontiguousarray(mat_idx).ravel(), np.ascontiguousarray(z).ravel(),
+        np.ascontiguousarray(T).ravel(), np.log10(strain_rate),
+        float(strain_rate), mat.f_f_c, mat.f_f_e, mat.f_p, mat.rho_b,
+        mat.log_eta_0, mat.eta_exp, mat.inv_n, mat.log_a_p_n, mat.q_p_n,
+        mat.log_b_f, mat.q_f, mat.sigma_d, mat.q_d, mat.a_d, mat.no_dorn,
+        'dislocation' in compute, 'dorn' in compute, 'diffusion' in compute,
+        log_viscosity, s_d_c.ravel(), s_d_e.ravel(), eff_vis.ravel())
+    return s_d_c, s_d_e, eff_vis
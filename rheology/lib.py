@@ -0,0 +1,1578 @@
+################################################################################
+#                     Copyright (C) 2019 by Christian Meessen                  #
+#                                                                              #
+#                         This file is part of Scripts                         #
+#                                                                              #
+#        Scripts is free software: you can redistribute it and/or modify       #
+#     it under the terms of the GNU General Public License as published by     #
+#           the Free Software Foundation version 3 of the License.             #
+#                                                                              #
+#      GMTScripts is distributed in the hope that it will be useful, but       #
+#          WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU       #
+#                   General Public License for more details.                   #
+#                                                                              #
+#      You should have received a copy of the GNU General Public License       #
+#       along with Scripts. If not, see <http://www.gnu.org/licenses/>.        #
+################################################################################
+import numpy as np
+
+
+def materials():
+    """
+    Contains a list of materials used for strength computation with exodus
+    module. Available properties are
+
+    Meta properties
+    ---------------
+    name : str
+        Name of the material
+    altname : str
+        Alternative name
+    source : str
+        Data source
+    via : str
+        Where this data has been used
+
+    Byerlee's law
+    -------------
+    f_f_e : float
+        Friction coefficient for extension
+    f_f_c : float
+        Friction coefficient for compression
+    f_p : float
+        Pore fluid factor
+    rho_b : float
+        Bulkd density of the rock / kg/m3
+
+    Dislocation creep
+    -----------------
+    a_p : float
+        Preexponential scaling factor / Pa^(-n)/s
+    n : float
+        Power law exponent
+    q_p : float
+        Activation energy / J/mol
+
+    Diffusion creep
+    ---------------
+    a_f : float
+        Preexponential scaling factor / 1/Pa/s
+    q_f : float
+        Activation energy / J/mol
+    a : float
+        Grain size / m
+    m : float
+        Grain size exponent
+
+    Dorn's law creep
+    ----------------
+    sigma_d : float
+        Dorn's law stress / Pa
+    q_d : float
+        Dorn's law activation energy / J/mol
+    a_d : float
+        Dorn's law strain rate
+    """
+    """
+    Template
+
+    r.append(dict(name='',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=,  # Bulk density
+                    # Dislocation creep
+                    a_p=,   # Preexponential scaling factor / Pa^(-n)/s
+                    n=,         # Power law exponent
+                    q_p=,   # Activation energy J/mol
+                    # Diffusion creep
+                    a_f=None,      # Preexp. scaling factor / 1/Pa/s
+                    q_f=None,      # Activation energy / J/mol
+                    a=None,        # Grain size / m
+                    m=None,        # Grain size exponent
+                    # Dorn's law properties
+                    sigma_d=None, # Dorn's law stress
+                    q_d=None,     # Dorn's law activation energy
+                    a_d=None))    # Dorn's law strain rate / 1/s
+    """
+    def AGPa(A,n):
+        A = float(A)
+        n = float(n)
+        return A*10.0**(-1.0*n*9.0)
+
+    r = list()
+    r.append(dict(name='olivine',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=3300.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(4e15,3.0),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.0,         # Power law exponent
+                    q_p=540.0e3))  # Activation energy J/mol
+    r.append(dict(name='olivine_wet',
+                    altname='',
+                    source='Jackson (2002)',
+                    source_disloc='Jackson (2002)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=3300.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=5.5e-25,   # Preexponential scaling factor / Pa^(-n)/s
+                    n=4.48,         # Power law exponent
+                    q_p=498.0e3))  # Activation energy J/mol
+    r.append(dict(name='diabase',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2950.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(3.2e6,3.4),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.4,         # Power law exponent
+                    q_p=260.0e3))  # Activation energy J/mol
+    r.append(dict(name='quartz_diorite',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2900.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(2e4,2.4),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=2.4,         # Power law exponent
+                    q_p=219.0e3))  # Activation energy J/mol
+    r.append(dict(name='anorthosite',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2800.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(1.3e6,3.2),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.2,         # Power law exponent
+                    q_p=238.0e3))  # Activation energy J/mol
+    r.append(dict(name='albite_rock',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2600.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(1.3e6,3.9),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.9,         # Power law exponent
+                    q_p=234.0e3))  # Activation energy J/mol
+    r.append(dict(name='quartzite_wet',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2650.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(2e3, 2.3),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=2.3,         # Power law exponent
+                    q_p=154.0e3))  # Activation energy J/mol
+    r.append(dict(name='quartzite',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2650.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(100,2.4),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=2.4,         # Power law exponent
+                    q_p=156.0e3))  # Activation energy J/mol
+    r.append(dict(name='granite_wet',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2650.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(100,2.4),   # Preexponential scaling factor / Pa^(-n)/s
+                    n=2.4,         # Power law exponent
+                    q_p=137.0e3))  # Activation energy J/mol
+    r.append(dict(name='granite',
+                    altname='',
+                    source='Ranalli and Murpy (1987)',
+                    source_disloc='Ranalli and Murpy (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Ranalli and Murpy (1987)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2650.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=AGPa(5,3.2),     # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.2,         # Power law exponent
+                    q_p=123.0e3))  # Activation energy J/mol
+    r.append(dict(name='olivine_dry',
+                    altname='Mantle',
+                    source='Goetze and Evans (1979)',
+                    source_disloc='Goetze and Evans (1979)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=3300.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=7.0e-14,   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.0,         # Power law exponent
+                    q_p=510.0e3,   # Activation energy J/mol
+                    # Dorn's law properties
+                    sigma_d=8.5e9, # Dorn's law stress
+                    q_d=535e3,     # Dorn's law activation energy
+                    a_d=5.7e11))   # Dorn's law strain rate / 1/s
+    r.append(dict(name='mafic_granulite',
+                    altname='Mafic granulites',
+                    source='Wilks and Carter (1990)',
+                    source_disloc='Wilks and Carter (1990)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=3050.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=8.83e-22,  # Preexponential scaling factor / Pa^(-n)/s
+                    n=4.2,         # Power law exponent
+                    q_p=445.0e3))  # Activation energy J/mol
+    r.append(dict(name='diabase_dry',
+                    altname='Gabbroid rocks',
+                    source='Carter and Tsenn (1987)',
+                    source_disloc='Carter and Tsenn (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2920.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=6.31e-20,  # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.05,        # Power law exponent
+                    q_p=276.0e3))  # Activation energy J/mol
+    r.append(dict(name='granite_dry',
+                    altname='Meta-sedimentary rocks',
+                    source='Carter and Tsenn (1987)',
+                    source_disloc='Carter and Tsenn (1987)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2750.0,  # Bulk density
+                    # Dislocation creep
+                    a_p=3.16e-26,  # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.3,         # Power law exponent
+                    q_p=186e3))    # Activation energy J/mol
+    r.append(dict(name='quartzite_dry',
+                    altname='Sediments',
+                    source='Burov et al. (1998)',
+                    source_disloc='Burov et al. (1998)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016), Carter and Tsenn (1987)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2600,    # Bulk density
+                    # Dislocation creep
+                    a_p=5.0e-12,   # Preexponential scaling factor / Pa^(-n)/s
+                    n=3.0,         # Power law exponent
+                    q_p=190e3))    # Activation energy J/mol
+    r.append(dict(name='diorite_dry',
+                    altname='Meta-igneous rocks',
+                    source='Burov et al. (1998)',
+                    source_disloc='Burov et al. (1998)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sippel et al. (2016)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,      # Pore fluid factor
+                    rho_b=2800,  # Bulk density
+                    # Dislocation creep
+                    a_p=5.2e-18,     # Preexponential scaling factor / Pa^(-n)/s
+                    n=2.4,         # Power law exponent
+                    q_p=219e3))    # Activation energy J/mol
+    r.append(dict(name='peridotite_dry',
+                    altname='Mantle lithosphere of slab and shield, \
+                             dry_olivine',
+                    source='Hirth and Kohlstedt (1996), Kameyama et al. (1999)',
+                    source_disloc='Hirth and Kohlstedt (1996)',
+                    source_diff='Kameyama et al. (1999)',
+                    source_dorn='Kameyama et al. (1999)',
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=3280.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=5.011e-17,    # Preexponential scaling factor, -16.3
+                    n=3.5,            # Power law exponent
+                    q_p=535e3,        # Activation energy
+                    # Diffusion creep
+                    a_f=2.570e-11,    # Preexp. scaling factor / 1/Pa/s, -10.59
+                    q_f=300e3,        # Activation energy / J/mol
+                    a=0.1e-3,         # Grain size / m
+                    m=2.5,            # Grain size exponent
+                    # Dorn's law
+                    sigma_d=8.5e9,    # Dorn's law stress / Pa
+                    q_d=535e3,        # Dorn's law activation energy / J/mol
+                    a_d=5.754e11))     # Dorn's law strain rate
+    r.append(dict(name='peridotite_dry_SA',
+                    altname='Mantle lithosphere of South America, not shield',
+                    source='Hirth and Kohlstedt (1996), Kameyama et al. (1999)',
+                    source_disloc='Hirth and Kohlstedt (1996)',
+                    source_diff='Kameyama et al. (1999)',
+                    source_dorn='Kameyama et al. (1999)',
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=3280.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=5.002e-15,      # Preexponential scaling factor
+                    n=3.5,            # Power law exponent
+                    q_p=515e3,        # Activation energy
+                    # Diffusion creep
+                    a_f=2.570e-11,     # Preexp. scaling factor / 1/Pa/s
+                    q_f=300e3,        # Activation energy / J/mol
+                    a=0.1e-3,         # Grain size / m
+                    m=2.5,            # Grain size exponent
+                    # Dorn's law
+                    sigma_d=8.5e9,    # Dorn's law stress / Pa
+                    q_d=535e3,        # Dorn's law activation energy / J/mol
+                    a_d=5.754e11))     # Dorn's law strain rate
+    r.append(dict(name='peridotite_dry_asthenosphere',
+    # Difference to peridotite_dry_SA is density
+                    altname='Mantle asthenosphere',
+                    source='Hirth and Kohlstedt (1996), Kameyama et al. (1999)',
+                    source_disloc='Hirth and Kohlstedt (1996)',
+                    source_diff='Kameyama et al. (1999)',
+                    source_dorn='Kameyama et al. (1999)',
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=3300.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=5.012e-15,      # Preexponential scaling factor
+                    n=3.5,            # Power law exponent
+                    q_p=515e3,        # Activation energy
+                    # Diffusion creep
+                    a_f=2.570e-11,     # Preexp. scaling factor / 1/Pa/s
+                    q_f=300e3,        # Activation energy / J/mol
+                    a=0.1e-3,         # Grain size / m
+                    m=2.5,            # Grain size exponent
+                    # Dorn's law
+                    sigma_d=8.5e9,    # Dorn's law stress / Pa
+                    q_d=535e3,        # Dorn's law activation energy / J/mol
+                    a_d=5.754e11))     # Dorn's law strain rate
+    r.append(dict(name='quartzite_wet_2650',
+                    altname='sediments',
+                    source='Gleason and Tullis (1995)',
+                    source_disloc='Gleason and Tullis (1995)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=2650.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=1e-28,        # Preexponential scaling factor
+                    n=4.0,            # Power law exponent
+                    q_p=223e3))       # Activation energy
+    r.append(dict(name='quartzite_wet_2700',
+                    altname='Uppermost crust continent',
+                    source='Gleason and Tullis (1995)',
+                    source_disloc='Gleason and Tullis (1995)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=2700.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=1e-28,        # Preexponential scaling factor
+                    n=4.0,            # Power law exponent
+                    q_p=223e3))       # Activation energy
+    r.append(dict(name='quartzite_wet_weak',
+                    altname='Upper crust continent',
+                    source='Gleason and Tullis (1995)',
+                    source_disloc='Gleason and Tullis (1995)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=2800.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=1e-27,        # Preexponential scaling factor
+                    n=4.0,            # Power law exponent
+                    q_p=223e3))       # Activation energy
+    r.append(dict(name='plagioclase_wet',
+    # Note: this one doesn't fit with the model parameters given in drezina.inp!
+                    altname='Granulite, mafic crust continent',
+                    source='Rybacki and Dresen (2000)',
+                    source_disloc='Rybacki and Dresen (2000)',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sobolev et al. (2006)',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=2950.0,     # Bulk density
+                    # Dislocation creep
+                    a_p=3.981e-16,      # Preexponential scaling factor
+                    n=3.0,            # Power law exponent
+                    q_p=356e3))       # Activation energy
+    r.append(dict(name='granulite_dry',
+                    altname='Pikwetonian granulite',
+                    source='UNKNOWN',
+                    source_disloc='UNKNOWN',
+                    source_diff=None,
+                    source_dorn=None,
+                    via='Sobolev et al. (2006) Drezina.inp',
+                    # Byerlee's law
+                    f_f_e=0.75,    # Friction coefficient extension
+                    f_f_c=2.0,     # Friction coefficient compression
+                    f_p=0.35,         # Pore fluid factor
+                    rho_b=2950,       # Bulk density
+                    # Dislocation creep
+                    a_p=3.2e-21,      # Preexponential scaling factor
+                    n=4.2,            # Power law exponent
+                    q_p=445.0e3))     # Activation energy
+    return r
+
+
+MATERIAL_PARAMS = ('f_f_e', 'f_f_c', 'f_p', 'rho_b',
+                   'a_p', 'n', 'q_p',
+                   'a_f', 'q_f', 'a', 'm',
+                   'sigma_d', 'q_d', 'a_d')
+
+
+class MaterialTable(object):
+    """
+    Columnar, compiled form of materials(). Every numerical property listed
+    in MATERIAL_PARAMS is stored as one contiguous float array with one
+    entry per material and NaN where a material does not define the law.
+    Materials are addressed by integer index, which is resolved from the
+    name through a dict.
+
+    Parameters
+    ----------
+    mats : list
+        List of material dicts as returned by materials(). Defaults to the
+        full database.
+
+    Examples
+    --------
+    >>> table = material_table()
+    >>> i = table.index('peridotite_dry')
+    >>> table['a_p'][i]
+    """
+    def __init__(self, mats=None):
+        if mats is None:
+            mats = materials()
+        self.names = [mat['name'] for mat in mats]
+        self._index = dict()
+        for i, name in enumerate(self.names):
+            if name in self._index:
+                raise ValueError('Duplicate material name', name)
+            self._index[name] = i
+        self._materials = [dict(mat) for mat in mats]
+        self.columns = dict()
+        for key in MATERIAL_PARAMS:
+            col = [mat.get(key) for mat in mats]
+            col = [np.nan if v is None else v for v in col]
+            self.columns[key] = np.ascontiguousarray(col, dtype=float)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def index(self, names):
+        """
+        Integer index of one material name, or an int array for a sequence
+        of names. Raises KeyError for unknown names.
+        """
+        if isinstance(names, str):
+            try:
+                return self._index[names]
+            except KeyError:
+                raise KeyError('Unknown material', names)
+        return np.array([self.index(name) for name in names], dtype=np.intp)
+
+    def material(self, name):
+        """
+        Return a copy of the material dict, as used by the scalar flow laws.
+        """
+        return dict(self._materials[self.index(name)])
+
+    def take(self, idx):
+        """
+        Gather the parameters of the materials at integer index idx.
+
+        Parameters
+        ----------
+        idx : int or np.ndarray
+            Material index per point
+
+        Returns
+        -------
+        params : dict
+            Same keys as MATERIAL_PARAMS, each holding table[key][idx].
+            It can be passed as material to all flow laws, which then
+            evaluate every point with its own parameters.
+        """
+        return {key: col[idx] for key, col in self.columns.items()}
+
+    def compiled(self, idx=None):
+        """
+        CompiledMaterial of the whole table, built on first use, or of the
+        materials at integer index idx.
+        """
+        if getattr(self, '_compiled', None) is None:
+            self._compiled = CompiledMaterial(self.columns)
+        if idx is None:
+            return self._compiled
+        return self._compiled.take(idx)
+
+
+_MATERIAL_TABLE = None
+
+
+def material_table():
+    """
+    Return the MaterialTable of the full materials() database. The table is
+    built on first use and shared afterwards.
+    """
+    global _MATERIAL_TABLE
+    if _MATERIAL_TABLE is None:
+        _MATERIAL_TABLE = MaterialTable()
+    return _MATERIAL_TABLE
+
+
+# Density-to-material rules of the LitMod driver. Each rule is
+# (material name, density) for an exact density code or
+# (material name, (lo, hi)) for the interval lo <= density < hi.
+# Rules are tried in order and the first match wins.
+LITMOD_DENSITY_RULES = [('granite_wet', 2750.0),       # upper crust
+                        ('quartzite', 2850.0),         # middle crust
+                        ('diabase', 2950.0),           # lower crust
+                        ('olivine', (2950.0, np.inf))] # mantle
+
+
+def _match_rule(rules, value):
+    """
+    Position of the first rule in rules matching the scalar value, or -1.
+    """
+    for i, (name, code) in enumerate(rules):
+        if np.ndim(code) == 0:
+            if value == code:
+                return i
+        elif code[0] <= value < code[1]:
+            return i
+    return -1
+
+
+def compile_density_rules(rules, table=None):
+    """
+    Compile a list of density rules into a piecewise constant lookup.
+    All exact codes and finite interval bounds become sorted edges; the
+    first matching rule is resolved once for every edge and for every open
+    segment between edges, so that classification needs only a single
+    np.searchsorted pass.
+
+    Parameters
+    ----------
+    rules : list
+        List of (name, code) or (name, (lo, hi)) tuples, see
+        LITMOD_DENSITY_RULES
+    table : MaterialTable
+        Table used to resolve the names. Defaults to material_table().
+
+    Returns
+    -------
+    edges : np.ndarray
+        Sorted unique edge densities
+    on_edge : np.ndarray
+        Material index for a density equal to edges[k]
+    between : np.ndarray
+        Material index for a density between edges[k-1] and edges[k], with
+        between[0] below the first and between[-1] above the last edge
+    """
+    if table is None:
+        table = material_table()
+    idx = np.array([table.index(name) for name, code in rules] + [-1],
+                   dtype=np.intp)
+    edges = list()
+    for name, code in rules:
+        edges.extend(np.atleast_1d(code))
+    edges = np.unique([e for e in edges if np.isfinite(e)])
+    on_edge = np.array([idx[_match_rule(rules, e)] for e in edges],
+                       dtype=np.intp)
+    if len(edges) == 0:
+        probes = [0.0]
+    else:
+        probes = np.concatenate(([edges[0] - 1.0],
+                                 0.5*(edges[1:] + edges[:-1]),
+                                 [edges[-1] + 1.0]))
+    between = np.array([idx[_match_rule(rules, p)] for p in probes],
+                       dtype=np.intp)
+    return edges, on_edge, between
+
+
+def classify_density(density, rules, table=None):
+    """
+    Assign a material to every point from its density following a list of
+    rules, see LITMOD_DENSITY_RULES and compile_density_rules().
+
+    Parameters
+    ----------
+    density : np.ndarray
+        Density / kg/m3
+    rules : list
+        List of (name, code) or (name, (lo, hi)) tuples
+    table : MaterialTable
+        Table used to resolve the names. Defaults to material_table().
+
+    Returns
+    -------
+    mat_idx : np.ndarray
+        Integer material index per point into table, -1 where no rule
+        matched.
+    """
+    edges, on_edge, between = compile_density_rules(rules, table)
+    density = np.asarray(density, dtype=float)
+    if len(edges) == 0:
+        return np.where(np.isnan(density), -1, between[0]).astype(np.intp)
+    pos = np.searchsorted(edges, density, side='right')
+    below = pos - 1
+    # pos == 0 wraps to the last edge, which never equals such a density
+    on = edges.take(below, mode='wrap') == density
+    mat_idx = np.where(on, on_edge.take(below, mode='wrap'), between[pos])
+    mat_idx[np.isnan(density)] = -1
+    return mat_idx
+
+
+def effective_viscosity(material,temp,strain_rate):
+    """
+    Compute the effective viscosity. Requires the material
+    properties pre-exponetial scaling factor (a_p), Power law exponent (n),
+    activation energy (q_p), and strain rate
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. The
+        required keys are 'a_p', 'n', and 'q_p' 
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s. Must broadcast against temp.
+
+    Returns
+    -------
+        effec_viscosity : float or np.ndarray
+    """
+    return _exp10(log10_effective_viscosity(material, temp, strain_rate))
+
+
+def sigma_byerlee(material, z, mode):
+    """
+    Compute the byerlee differential stress. Requires the material
+    properties friction coefficient (f_f), pore fluid factor (f_p) and
+    the bulk density (rho_b).
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. The
+        required keys are 'f_f_e', 'f_f_c', 'f_p' and 'rho_b'
+    z : float
+        Depth below surface in m
+    mode : str
+        'compression' or 'extension'
+
+    Returns
+    -------
+        sigma_d : float
+    """
+    if mode == 'compression':
+        f_f = material['f_f_c']
+    elif mode == 'extension':
+        f_f = material['f_f_e']
+    else:
+        raise ValueError('Invalid parameter for mode:', mode)
+    f_p = material['f_p']
+    rho_b = material['rho_b']
+    g = 9.81  # m/s2
+    return f_f*rho_b*g*z*(1.0 - f_p)
+
+def sigma_diffusion(material, temp, strain_rate):
+    """
+    Computes differential stress for diffusion creept at specified
+    temperature and strain rate. Material properties require grain size 'a',
+    grain size exponent 'm', preexponential scaling factor for diffusion
+    creep 'a_f', and activation energy 'q_f'.
+
+    For diffusion creep, n=1.
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. Required
+        keys are 'a', 'm', 'a_f', 'q_f'
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s
+
+    Returns
+    -------
+        sigma_diffusion : float or np.ndarray
+            NaN wherever the material has no diffusion creep law.
+    """
+    return _exp10(log10_sigma_diffusion(material, temp, strain_rate))
+
+def sigma_dislocation(material, temp, strain_rate):
+    """
+    Compute differential stress envelope for dislocation creep at
+    certain temeprature and strain rate. Requires preexponential scaling
+    factor 'a_p', power law exponent 'n' and activation energy 'q_p'.
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. Required
+        keys are 'a_p', 'n' and 'q_p'
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s
+
+    Returns
+    -------
+        sigma_d : float or np.ndarray
+    """
+    return _exp10(log10_sigma_dislocation(material, temp, strain_rate))
+
+def sigma_dorn(material, temp, strain_rate):
+    """
+    Compute differential stress for solid state creep with Dorn's law.
+    Requires Dorn's law stress 'sigma_d', Dorn's law activation energy
+    'q_d' and Dorn's law strain rate 'A_p'.
+
+    Dorn's creep is a special case of Peierl's creep with q=2
+
+    sigma_delta = sigma_d*(1-(-R*T/Q*ln(strain_rate/A_d))^(1/q))
+
+    Negative stresses (temperatures above the Dorn's law validity range)
+    are clipped to zero element-wise.
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. Required
+        keys are 'sigma_d', 'q_d' and 'A_p'
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s
+
+    Returns
+    -------
+        sigma_d : float or np.ndarray
+    """
+    R = 8.314472 # m2kg/s2/K/mol
+    sigma_d, q_d, a_d = [np.nan if material[key] is None else material[key]
+                         for key in ('sigma_d', 'q_d', 'a_d')]
+    temp = np.asarray(temp, dtype=float)
+    strain_rate = np.asarray(strain_rate, dtype=float)
+    missing = (np.asarray(q_d) == 0) | (np.asarray(a_d) == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dorn = sigma_d*(1.0 - np.sqrt(-1.0*R*temp/q_d*np.log(strain_rate/a_d)))
+    return np.where(missing, np.nan, np.where(dorn < 0.0, 0.0, dorn))[()]
+
+# Flow laws in log space. Power laws and Arrhenius terms become linear
+# combinations of log10 parameters and 1/T, which cannot overflow. The linear
+# flow laws above exponentiate these results.
+LOG10_E = np.log10(np.e)
+LN_10 = np.log(10.0)
+
+
+def _exp10(log_value):
+    """
+    10**log_value, computed with exp() which is faster than pow().
+    """
+    return np.exp(LN_10*log_value)
+
+
+class CompiledMaterial(object):
+    """
+    Material with the parts of the flow laws that depend neither on
+    temperature nor on strain rate folded into constants, so that the
+    kernels do not repeat them for every point:
+
+    log_eta_0 = log10((2**(1-n)/n)/(3**(1+n)/2*n)*a_p**(-1/n))
+    eta_exp = 1/n - 1
+    inv_n = 1/n
+    log_a_p_n = log10(a_p)/n
+    q_p_n = log10(e)*q_p/n
+    log_b_f = log10(a**m/a_f)
+    q_f = log10(e)*q_f
+
+    Missing parameters are NaN, so a dict with only the keys of one law
+    can be compiled, and laws lists the creep laws the material defines. Byerlee's law and Dorn's law
+    parameters are kept as they are and can be read as compiled[key], so
+    a CompiledMaterial can be passed to sigma_byerlee().
+
+    Parameters
+    ----------
+    material : dict
+        Dict of type as defined in def materials(), or per-point parameters
+        from MaterialTable.take()
+    """
+    __slots__ = ('laws', 'f_f_e', 'f_f_c', 'f_p', 'rho_b',
+                 'log_eta_0', 'eta_exp', 'inv_n', 'log_a_p_n', 'q_p_n',
+                 'log_b_f', 'q_f', 'sigma_d', 'q_d', 'a_d', 'no_dorn')
+
+    def __init__(self, material):
+        def get(key):
+            value = material.get(key)
+            return np.nan if value is None else value
+        self.laws = tuple(law for law, key in (('dislocation', 'a_p'),
+                                               ('diffusion', 'a_f'),
+                                               ('dorn', 'sigma_d'))
+                          if key in material)
+        for key in ('f_f_e', 'f_f_c', 'f_p', 'rho_b'):
+            setattr(self, key, get(key))
+        a_p = get('a_p')
+        n = get('n')
+        self.inv_n = 1/n
+        self.eta_exp = 1/n - 1
+        self.log_a_p_n = np.log10(a_p)/n
+        self.log_eta_0 = np.log10((2**(1-n)/n)/(3**(1+n)/2*n)) \
+            - self.log_a_p_n
+        self.q_p_n = LOG10_E*get('q_p')/n
+        self.log_b_f = get('m')*np.log10(get('a')) - np.log10(get('a_f'))
+        self.q_f = LOG10_E*get('q_f')
+        self.sigma_d = get('sigma_d')
+        self.q_d = get('q_d')
+        self.a_d = get('a_d')
+        self.no_dorn = (np.asarray(self.q_d) == 0) | \
+            (np.asarray(self.a_d) == 0)
+
+    def __getitem__(self, key):
+        if key == 'laws' or key not in CompiledMaterial.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def _map(self, func):
+        new = CompiledMaterial.__new__(CompiledMaterial)
+        new.laws = self.laws
+        for name in CompiledMaterial.__slots__[1:]:
+            setattr(new, name, func(getattr(self, name)))
+        return new
+
+    def take(self, idx):
+        """
+        Gather the points at integer index idx of array parameters, see
+        MaterialTable.compiled().
+        """
+        return self._map(lambda value: value[idx])
+
+    def expand(self):
+        """
+        Parameters as column vectors for broadcasting against a row of
+        strain rates or points.
+        """
+        return self._map(_expand)
+
+
+class FlowLawContext(object):
+    """
+    Terms shared by the flow laws of one material evaluated at the same
+    temperatures and strain rates. 1/(R*T) and log10 of the strain rate are
+    computed once per point, the Arrhenius terms of the material on first
+    use. Dislocation creep and the effective viscosity share the term
+    q_p/(n*R*T), so the strength envelope and the viscosity of a point
+    evaluated from one context compute it only once.
+
+    Parameters
+    ----------
+    material : dict or CompiledMaterial
+        Dict of type as defined in def materials(), or per-point parameters
+        from MaterialTable.take(). Dicts are compiled on construction.
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Strain rate in 1/s, broadcastable against temp
+    """
+    def __init__(self, material, temp, strain_rate):
+        R = 8.314472 # m2kg/s2/K/mol
+        if not isinstance(material, CompiledMaterial):
+            material = CompiledMaterial(material)
+        self.material = material
+        self.strain_rate = np.asarray(strain_rate, dtype=float)
+        self.log_rate = np.log10(self.strain_rate)
+        self.rt = R*np.asarray(temp, dtype=float)
+        self.inv_rt = 1.0/self.rt
+        self.shape = np.broadcast(self.inv_rt, self.strain_rate).shape
+        self._arrhenius = {}
+
+    def arrhenius(self, law):
+        """
+        log10 of the Arrhenius factor exp(q_p/(n*R*T)) of the power law
+        ('p') or exp(q_f/(R*T)) of the diffusion law ('f').
+        """
+        if law not in self._arrhenius:
+            if law == 'p':
+                q = self.material.q_p_n
+            elif law == 'f':
+                q = self.material.q_f
+            else:
+                raise ValueError('Unknown flow law', law)
+            self._arrhenius[law] = q*self.inv_rt
+        return self._arrhenius[law]
+
+    def nan(self):
+        return np.full(self.shape, np.nan)
+
+
+def _log10_viscosity(ctx):
+    mat = ctx.material
+    return mat.log_eta_0 + mat.eta_exp*ctx.log_rate + ctx.arrhenius('p')
+
+
+def _log10_dislocation(ctx):
+    mat = ctx.material
+    return mat.inv_n*ctx.log_rate - mat.log_a_p_n + ctx.arrhenius('p')
+
+
+def _log10_diffusion(ctx):
+    return ctx.material.log_b_f + ctx.log_rate + ctx.arrhenius('f')
+
+
+def _dorn(ctx):
+    mat = ctx.material
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dorn = mat.sigma_d*(1.0 - np.sqrt(-1.0*np.log(ctx.strain_rate/mat.a_d)
+                                          / mat.q_d*ctx.rt))
+    if np.any(mat.no_dorn):
+        dorn = np.where(mat.no_dorn, np.nan, dorn)
+    return dorn
+
+
+def _log10_dorn(ctx):
+    with np.errstate(divide='ignore'):
+        return np.log10(np.maximum(_dorn(ctx), 0.0))
+
+
+def log10_effective_viscosity(material, temp, strain_rate):
+    """
+    log10 of effective_viscosity().
+
+    Parameters
+    ----------
+    material : dict
+        Dictionary with the material properties in SI units. The
+        required keys are 'a_p', 'n', and 'q_p'
+    temp : float or np.ndarray
+        Temperature in Kelvin
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s
+
+    Returns
+    -------
+        log10_viscosity : float or np.ndarray
+            log10 of the effective viscosity in Pa s
+    """
+    return _log10_viscosity(FlowLawContext(material, temp, strain_rate))[()]
+
+
+def log10_sigma_dislocation(material, temp, strain_rate):
+    """
+    log10 of sigma_dislocation().
+
+    Returns
+    -------
+        log10_sigma : float or np.ndarray
+            log10 of the differential stress in Pa
+    """
+    return _log10_dislocation(FlowLawContext(material, temp,
+                                             strain_rate))[()]
+
+
+def log10_sigma_diffusion(material, temp, strain_rate):
+    """
+    log10 of sigma_diffusion(). NaN wherever the material has no diffusion
+    creep law.
+
+    Returns
+    -------
+        log10_sigma : float or np.ndarray
+            log10 of the differential stress in Pa
+    """
+    return _log10_diffusion(FlowLawContext(material, temp, strain_rate))[()]
+
+
+def log10_sigma_dorn(material, temp, strain_rate):
+    """
+    log10 of sigma_dorn(), -inf where Dorn's law gives zero stress.
+    """
+    return _log10_dorn(FlowLawContext(material, temp, strain_rate))[()]
+
+
+def _check_depth(z):
+    """
+    Raise ValueError if any depth in z is negative.
+    """
+    z = np.asarray(z, dtype=float)
+    if np.any(z < 0):
+        raise ValueError('Depth must be positive. Got z =', z[z < 0].min())
+    return z
+
+
+def _check_compute(compute):
+    """
+    Validate the list of creep processes passed to sigma_d().
+    """
+    compute_default = ['dislocation', 'dorn']
+    if compute is None:
+        return compute_default
+    for kwd in compute:
+        if kwd not in ['dislocation', 'diffusion', 'dorn']:
+            raise ValueError('Unknown compute keyword', kwd)
+    return compute
+
+
+def log10_sigma_creep(material, temp, strain_rate, compute=None):
+    """
+    Computes log10 of the ductile part of the strength envelope. Dorn's law
+    replaces dislocation creep wherever the dislocation creep stress
+    exceeds 200 MPa and Dorn's law gives a positive stress; diffusion creep,
+    if requested, is combined with np.fmin so that missing laws (NaN) are
+    ignored.
+
+    Parameters
+    ----------
+    material : dict
+        Dict containing material properties required by sigma_dislocation(),
+        sigma_dorn() and sigma_diffusion()
+    temp : float or np.ndarray
+        Temperature in K
+    strain_rate : float or np.ndarray
+        Reference strain rate in 1/s
+    compute : list
+        List of processes to compute: 'dislocation', 'diffusion', 'dorn'.
+        Default is ['dislocation', 'dorn'].
+
+    Returns
+    -------
+    log10_sigma_creep : float or np.ndarray
+        log10 of the differential stress in Pa, NaN where no creep law
+        applies
+    """
+    ctx = FlowLawContext(material, temp, strain_rate)
+    return _log10_creep(ctx, _check_compute(compute))[()]
+
+
+def _log10_creep(ctx, compute):
+    laws = ctx.material.laws
+    if 'dislocation' in compute and 'dislocation' in laws:
+        s_creep = _log10_dislocation(ctx)
+    else:
+        s_creep = ctx.nan()
+    if 'dorn' in compute and 'dorn' in laws:
+        s_creep = _select_dorn(s_creep, _log10_dorn(ctx))
+    if 'diffusion' in compute and 'diffusion' in laws:
+        s_creep = np.fmin(s_creep, _log10_diffusion(ctx))
+    return s_creep
+
+
+def _select_dorn(s_disloc, s_dorn):
+    """
+    Dorn's law where the dislocation creep stress exceeds 200 MPa and
+    Dorn's law gives a positive stress. Stresses as log10.
+    """
+    return np.where((s_disloc > np.log10(200e6)) & (s_dorn > -np.inf),
+                    s_dorn, s_disloc)
+
+
+def sigma_creep(material, temp, strain_rate, compute=None):
+    """
+    Ductile part of the strength envelope in Pa, see log10_sigma_creep().
+    """
+    return _exp10(log10_sigma_creep(material, temp, strain_rate, compute))
+
+
+def _envelope(s_byerlee, log_creep):
+    """
+    Minimum of Byerlee's law and the creep stress given as log10. Creep
+    stresses beyond the float range become inf, where Byerlee's law is the
+    minimum anyway.
+    """
+    with np.errstate(over='ignore'):
+        return np.fmin(s_byerlee, _exp10(log_creep))
+
+
+def _strength(log_creep, s_b_c, s_b_e):
+    """
+    Compression and extension envelopes from log10 of the creep stress and
+    the Byerlee's law stresses of both modes.
+    """
+    with np.errstate(over='ignore'):
+        s_creep = _exp10(log_creep)
+    return -1*np.fmin(s_b_c, s_creep), np.fmin(s_b_e, s_creep)
+
+
+def sigma_d(material, z, temp, strain_rate=None,
+            compute=None, mode=None):
+    """
+    Computes differential stress for a material at given depth, temperature
+    and strain rate. Returns the minimum of Byerlee's law, dislocation creep
+    or dorn's creep. Works element-wise on arrays of z and temp.
+
+    Parameters
+    ----------
+    material : dict
+        Dict containing material properties required by sigma_byerlee() and
+        sigma_dislocation()
+    z : float or np.ndarray
+        Positive depth im m below surface
+    temp : float or np.ndarray
+        Temperature in K
+    strain_rate : float
+        Reference strain rate in 1/s
+    compute : list
+        List of processes to compute: 'dislocation', 'diffusion', 'dorn'.
+        Default is ['dislocation', 'dorn'].
+    mode : str
+        'compression' or 'extension'
+
+    Returns
+    -------
+    Sigma : float or np.ndarray
+        Differential stress in Pa
+    """
+    z = _check_depth(z)
+    if strain_rate is None:
+        raise ValueError('A reference strain rate is required')
+    s_byerlee = sigma_byerlee(material, z, mode)
+    s_creep = log10_sigma_creep(material, temp, strain_rate, compute=compute)
+    return _envelope(s_byerlee, s_creep)[()]
+
+
+def yield_strength_envelope(material, z, temp, strain_rate, compute=None,
+                            unique=None):
+    """
+    Compute the compression and extension yield strength envelopes for
+    whole columns of depth and temperature in one pass. The creep branch,
+    which does not depend on the loading mode, is evaluated only once and
+    combined with Byerlee's law for both modes.
+
+    Parameters
+    ----------
+    material : dict
+        Dict of type as defined in def materials()
+    z : np.ndarray
+        Array of positive depth values in m
+    temp : np.ndarray
+        Array broadcastable against z with temperature in Kelvin
+    strain_rate : float
+        Strain rate in 1/s
+    compute : list
+        List of processes to compute: 'dislocation', 'diffusion', 'dorn'.
+        Default is ['dislocation', 'dorn'].
+    unique : tuple
+        (first, inverse) from unique_keys(temp) for 1D temp. The creep
+        stress, which depends only on temperature, is then evaluated once
+        per distinct temperature.
+
+    Returns
+    -------
+    s_d_c : np.ndarray
+        Differential stress in compression in Pa (negative)
+    s_d_e : np.ndarray
+        Differential stress in extension in Pa (positive)
+    """
+    z = _check_depth(z)
+    compute = _check_compute(compute)
+    if unique is None:
+        ctx = FlowLawContext(material, temp, strain_rate)
+        log_creep = _log10_creep(ctx, compute)
+    else:
+        first, inverse = unique
+        ctx = FlowLawContext(material, np.asarray(temp, dtype=float)[first],
+                             strain_rate)
+        log_creep = _log10_creep(ctx, compute)[inverse]
+    s_d_c, s_d_e = _strength(log_creep,
+                             sigma_byerlee(material, z, 'compression'),
+                             sigma_byerlee(material, z, 'extension'))
+    return s_d_c[()], s_d_e[()]
+
+
+def unique_keys(*keys):
+    """
+    Find the distinct rows of one or more key columns, e.g. material index
+    and temperature, so that quantities depending only on the keys can be
+    evaluated once per distinct row and scattered back to all rows.
+
+    Parameters
+    ----------
+    *keys : np.ndarray
+        1D arrays of the same length
+
+    Returns
+    -------
+    first : np.ndarray
+        Index of one row per distinct key
+    inverse : np.ndarray
+        Index into first for every row, values[first][inverse] restores
+        values for all rows
+
+    Examples
+    --------
+    >>> first, inverse = unique_keys(mat_idx, T)
+    >>> ratio = len(inverse)/len(first)
+    """
+    if len(keys[0]) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    inverse = None
+    for key in keys:
+        key_inverse = np.unique(key, return_inverse=True)[1].ravel()
+        if inverse is not None:
+            key_inverse = inverse*np.int64(key_inverse.max() + 1) \
+                + key_inverse
+            key_inverse = np.unique(key_inverse, return_inverse=True)[1]
+        inverse = key_inverse.ravel()
+    first = np.empty(inverse.max() + 1, dtype=np.intp)
+    first[inverse] = np.arange(len(inverse))
+    return first, inverse
+
+
+def compute_dsigma(mat, z, T, strain_rate):
+    """
+    Compute differential stress for a given material at depths z and
+    temperatures T. Comptues for both compression and extension, see
+    yield_strength_envelope().
+
+    Parameters
+    ----------
+    mat : dict
+        Dict of type as defined in def materials()
+    z : np.array
+        1D array of depth values in positive m
+    T : np.array
+        1D array of same shape as z with T in Kelvin
+    strain_rate : float
+        Strain rate in 1/s
+
+    Returns
+    -------
+    s_d_c : np.array
+        1D array with differential stress in compression.
+    s_d_e : np.array
+        1D array with differential stress in extension.
+    """
+    return yield_strength_envelope(mat, z, T, strain_rate)
+
+
+def compute_mixed(mat_idx, z, T, strain_rate, table=None, compute=None,
+                  log_viscosity=False, unique=None):
+    """
+    Compute strength envelopes and effective viscosity for points made of
+    different materials in one vectorized call. The flow law parameters of
+    every point are gathered from the table by its material index, so the
+    cost does not depend on the number of materials.
+
+    Parameters
+    ----------
+    mat_idx : np.ndarray
+        Integer material index per point into table, e.g. from
+        classify_density(). Negative values mark points without material.
+    z : np.ndarray
+        Depth in positive m
+    T : np.ndarray
+        Temperature in Kelvin
+    strain_rate : float
+        Strain rate in 1/s
+    table : MaterialTable
+        Defaults to material_table().
+    compute : list
+        Creep processes, see sigma_d().
+    log_viscosity : bool
+        Return log10 of the effective viscosity, computed without
+        exponentiating.
+    unique : tuple
+        (first, inverse) from unique_keys(mat_idx, T). Creep stress and
+        viscosity, which depend only on material and temperature, are then
+        evaluated once per distinct key and scattered to all points.
+
+    Returns
+    -------
+    s_d_c : np.ndarray
+        Differential stress in compression in Pa (negative)
+    s_d_e : np.ndarray
+        Differential stress in extension in Pa (positive)
+    eff_vis : np.ndarray
+        Effective viscosity in Pa s, or its log10
+    NaN where mat_idx is negative.
+    """
+    if table is None:
+        table = material_table()
+    mat_idx = np.asarray(mat_idx, dtype=np.intp)
+    valid = mat_idx >= 0
+    safe_idx = np.where(valid, mat_idx, 0)
+    compute = _check_compute(compute)
+    z = _check_depth(z)
+    if unique is None:
+        params = table.compiled(safe_idx)
+        ctx = FlowLawContext(params, T, strain_rate)
+        log_creep = _log10_creep(ctx, compute)
+        eff_vis = _log10_viscosity(ctx)
+    else:
+        first, inverse = unique
+        ctx = FlowLawContext(table.compiled(safe_idx[first]),
+                             np.asarray(T, dtype=float)[first], strain_rate)
+        log_creep = _log10_creep(ctx, compute)[inverse]
+        eff_vis = _log10_viscosity(ctx)[inverse]
+        params = {key: table[key][safe_idx]
+                  for key in ('f_f_e', 'f_f_c', 'f_p', 'rho_b')}
+    s_d_c, s_d_e = _strength(log_creep,
+                             sigma_byerlee(params, z, 'compression'),
+                             sigma_byerlee(params, z, 'extension'))
+    if not log_viscosity:
+        eff_vis = _exp10(eff_vis)
+    return (np.where(valid, s_d_c, np.nan), np.where(valid, s_d_e, np.nan),
+            np.where(valid, eff_vis, np.nan))
+
+
+def _expand(value):
+    """
+    Material parameter as float or as column vector for broadcasting
+    per-point parameters against a row of strain rates.
+    """
+    if value is None:
+        return np.nan
+    value = np.asarray(value, dtype=float)
+    return value[..., None] if value.ndim else value[()]
+
+
+def yield_strength_sweep(material, z, temp, strain_rates, compute=None,
+                         log_viscosity=False, unique=None):
+    """
+    Compute strength envelopes and effective viscosity for many strain
+    rates at once. z and temp are broadcast against the vector of strain
+    rates to give one column per rate. The Arrhenius terms do not depend
+    on the strain rate and are computed once per point, see
+    FlowLawContext. All flow laws are evaluated in log space.
+
+    Parameters
+    ----------
+    material : dict
+        Dict of type as defined in def materials(), or per-point parameters
+        from MaterialTable.take()
+    z : np.ndarray
+        1D array of positive depth values in m
+    temp : np.ndarray
+        1D array of same shape as z with temperature in Kelvin
+    strain_rates : np.ndarray
+        1D array of strain rates in 1/s
+    compute : list
+        List of processes to compute: 'dislocation', 'diffusion', 'dorn'.
+        Default is ['dislocation', 'dorn'].
+    log_viscosity : bool
+        Return log10 of the effective viscosity.
+    unique : tuple
+        (first, inverse) from unique_keys() of the temperatures, and of the
+        material index for per-point parameters. Creep and viscosity are
+        then evaluated once per distinct key.
+
+    Returns
+    -------
+    s_d_c : np.ndarray
+        Differential stress in compression in Pa (negative), shape
+        (npoints, nrates)
+    s_d_e : np.ndarray
+        Differential stress in extension in Pa (positive), same shape
+    eff_vis : np.ndarray
+        Effective viscosity in Pa s, or its log10, same shape
+    """
+    compute = _check_compute(compute)
+    z = _check_depth(z)
+    if not isinstance(material, CompiledMaterial):
+        material = CompiledMaterial(material)
+    rates = np.asarray(strain_rates, dtype=float).ravel()
+    temp = np.asarray(temp, dtype=float)
+    params = material
+    if unique is not None:
+        first, inverse = unique
+        temp = temp[first]
+        if np.ndim(material.inv_n):
+            params = material.take(first)
+    ctx = FlowLawContext(params.expand(), temp[..., None], rates)
+    log_creep = _log10_creep(ctx, compute)
+    eff_vis = _log10_viscosity(ctx)
+    if unique is not None:
+        log_creep = log_creep[inverse]
+        eff_vis = eff_vis[inverse]
+    s_d_c, s_d_e = _strength(
+        log_creep, sigma_byerlee(material, z, 'compression')[..., None],
+        sigma_byerlee(material, z, 'extension')[..., None])
+    if not log_viscosity:
+        eff_vis = _exp10(eff_vis)
+    return s_d_c, s_d_e, np.broadcast_to(eff_vis, s_d_c.shape)
+
+
+def compare_materials(z, T, strain_rate, names=None, table=None,
+                      compute=None, chunksize=100000, log_viscosity=False):
+    """
+    Evaluate several materials against the same points, e.g. to choose a
+    rheology for a region. The parameters of all materials are broadcast
+    as a column against blocks of chunksize points, so that temporary
+    arrays stay bounded by len(names)*chunksize. The results hold
+    len(names)*len(z) values each; for more points than fit in memory call
+    this for blocks of points, see rheology.pipeline.run_v2rhot_comparison().
+
+    Parameters
+    ----------
+    z : np.ndarray
+        1D array of positive depth values in m
+    T : np.ndarray
+        1D array of same shape as z with temperature in Kelvin
+    strain_rate : float
+        Strain rate in 1/s
+    names : list of str
+        Materials to compare. Default is all materials of the table.
+    table : MaterialTable
+        Defaults to material_table().
+    compute : list
+        Creep processes, see sigma_d().
+    chunksize : int
+        Number of points evaluated at a time
+    log_viscosity : bool
+        Return log10 of the effective viscosity.
+
+    Returns
+    -------
+    s_d_c : np.ndarray
+        Differential stress in compression in Pa (negative), shape
+        (len(names), len(z))
+    s_d_e : np.ndarray
+        Differential stress in extension in Pa (positive), same shape
+    eff_vis : np.ndarray
+        Effective viscosity in Pa s, or its log10, same shape
+    """
+    if table is None:
+        table = material_table()
+    if names is None:
+        names = table.names
+    compute = _check_compute(compute)
+    params = table.compiled(table.index(names)).expand()
+    z = np.atleast_1d(np.asarray(z, dtype=float))
+    T = np.atleast_1d(np.asarray(T, dtype=float))
+    shape = (len(names), len(z))
+    s_d_c = np.empty(shape)
+    s_d_e = np.empty(shape)
+    eff_vis = np.empty(shape)
+    for i in range(0, len(z), chunksize):
+        block = slice(i, i + chunksize)
+        zb = _check_depth(z[block])
+        ctx = FlowLawContext(params, T[block], strain_rate)
+        s_d_c[:, block], s_d_e[:, block] = _strength(
+            _log10_creep(ctx, compute),
+            sigma_byerlee(params, zb, 'compression'),
+            sigma_byerlee(params, zb, 'extension'))
+        log_vis = _log10_viscosity(ctx)
+        eff_vis[:, block] = log_vis if log_viscosity else _exp10(log_vis)
+    return s_d_c, s_d_e, eff_vis
@@ -0,0 +1,164 @@
+"""
+Tabulated strength envelopes and viscosity for repeated evaluation.
+"""
+import numpy as np
+from .lib import FlowLawContext, sigma_byerlee, _check_compute
+from .lib import _check_depth, _exp10, _log10_creep, _log10_viscosity
+from .lib import _log10_dislocation, _log10_diffusion, _dorn
+
+
+class StrengthTable(object):
+    """
+    Lookup table of the strength envelopes and the effective viscosity of
+    one material at one strain rate.
+
+    The envelope is the minimum of Byerlee's law, which depends only on
+    depth, and of the creep stress, which depends only on temperature. A
+    (z, T) table of it therefore factorises: Byerlee's law is linear in
+    depth and evaluated exactly, the flow laws are tabulated against
+    temperature on nodes regular in 1/T and interpolated linearly. log10
+    of dislocation creep, diffusion creep and viscosity is linear in 1/T,
+    so their interpolation is exact up to rounding; Dorn's law is smooth
+    and tabulated as stress. The laws are combined as in sigma_creep() and
+    with Byerlee's law only after interpolation, so the switches between
+    them and the brittle-ductile transition stay sharp. Points outside
+    temp_range are evaluated directly.
+
+    On construction the table is compared with direct evaluation at check
+    points between every pair of nodes. The maximum relative errors of
+    creep stress and viscosity found are stored in max_rel_error; the
+    error of the envelope is at most that of the creep stress. Points very
+    close to the switch from dislocation creep to Dorn's law may change
+    branch, increase size if the error is too large.
+
+    Parameters
+    ----------
+    material : dict
+        Dict of type as defined in def materials()
+    strain_rate : float
+        Strain rate in 1/s
+    temp_range : tuple of float
+        (min, max) temperature in Kelvin
+    size : int
+        Number of table nodes
+    compute : list
+        Creep processes, see sigma_d().
+    check : int
+        Number of points per table interval compared with direct
+        evaluation
+
+    Examples
+    --------
+    >>> table = StrengthTable(mat, 1e-15, (273, 2273))
+    >>> table.max_rel_error
+    >>> s_d_c, s_d_e, log_vis = table(z, T)
+    """
+    def __init__(self, material, strain_rate, temp_range=(273.0, 2273.0),
+                 size=2001, compute=None, check=8):
+        if size < 2:
+            raise ValueError('A table needs at least 2 nodes. Got', size)
+        if not 0 < temp_range[0] < temp_range[1]:
+            raise ValueError('Invalid temperature range', temp_range)
+        self.material = material
+        self.strain_rate = strain_rate
+        self.compute = _check_compute(compute)
+        self.temp_range = tuple(temp_range)
+        self.size = size
+        # nodes regular in 1/T, from the hottest to the coldest
+        self._u0 = 1.0/temp_range[1]
+        u1 = 1.0/temp_range[0]
+        self._scale = (size - 1)/(u1 - self._u0)
+        u = np.linspace(self._u0, u1, size)
+        u[-1] = u1
+        self.tables = self._laws(1.0/u)
+        self._slopes = {law: np.diff(values)
+                        for law, values in self.tables.items()}
+
+        # sample every interval at check points between the nodes
+        w = (np.arange(1, check + 1)/(check + 1.0))[:, None]
+        temp = 1.0/(u[:-1] + w*np.diff(u))
+        ctx = FlowLawContext(material, temp, strain_rate)
+        values = {law: self.tables[law][:-1] + w*self._slopes[law]
+                  for law in self.tables}
+        with np.errstate(divide='ignore'):
+            creep = np.log10(self._creep(values))
+        self.max_rel_error = {
+            'creep': self._rel_error(creep, _log10_creep(ctx, self.compute)),
+            'viscosity': self._rel_error(values['viscosity'],
+                                         _log10_viscosity(ctx))}
+
+    def _laws(self, temp):
+        """
+        Tabulated quantities at temperatures temp: log10 of viscosity,
+        dislocation and diffusion creep and the unclipped Dorn's law stress.
+        """
+        ctx = FlowLawContext(self.material, temp, self.strain_rate)
+        laws = ctx.material.laws
+        tables = {'viscosity': _log10_viscosity(ctx)}
+        if 'dislocation' in self.compute and 'dislocation' in laws:
+            tables['dislocation'] = _log10_dislocation(ctx)
+        if 'dorn' in self.compute and 'dorn' in laws:
+            tables['dorn'] = _dorn(ctx)
+        if 'diffusion' in self.compute and 'diffusion' in laws:
+            tables['diffusion'] = _log10_diffusion(ctx)
+        return tables
+
+    @staticmethod
+    def _creep(values):
+        """
+        Creep stress in Pa from the interpolated laws, see sigma_creep().
+        """
+        with np.errstate(over='ignore'):
+            if 'dislocation' in values:
+                s_creep = _exp10(values['dislocation'])
+            else:
+                s_creep = np.full(np.shape(values['viscosity']), np.nan)
+            if 'dorn' in values:
+                dorn = np.maximum(values['dorn'], 0.0)
+                s_creep = np.where((s_creep > 200e6) & (dorn > 0), dorn,
+                                   s_creep)
+            if 'diffusion' in values:
+                s_creep = np.fmin(s_creep, _exp10(values['diffusion']))
+        return s_creep
+
+    @staticmethod
+    def _rel_error(log_approx, log_exact):
+        with np.errstate(invalid='ignore', over='ignore'):
+            rel = np.abs(_exp10(log_approx - log_exact) - 1)
+        rel = np.where(log_approx == log_exact, 0.0, rel)
+        return np.nanmax(rel) if np.isfinite(log_exact).any() else np.nan
+
+    def __call__(self, z, temp):
+        """
+        Evaluate the table at depth z (m) and temperature temp (K).
+
+        Returns
+        -------
+        s_d_c : np.ndarray
+            Differential stress in compression in Pa (negative)
+        s_d_e : np.ndarray
+            Differential stress in extension in Pa (positive)
+        log_vis : np.ndarray
+            log10 of the effective viscosity in Pa s
+        """
+        z, temp = np.broadcast_arrays(_check_depth(z),
+                                      np.asarray(temp, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fu = (1.0/temp - self._u0)*self._scale
+            # outside the table j is clipped and the result replaced below
+            j = fu.astype(np.intp)
+        w = fu - j
+        values = {law: table.take(j, mode='clip')
+                  + w*self._slopes[law].take(j, mode='clip')
+                  for law, table in self.tables.items()}
+        inside = (fu >= 0) & (fu <= self.size - 1)
+        if not np.all(inside):
+            outside = ~inside
+            direct = self._laws(temp[outside])
+            for law in values:
+                values[law][outside] = direct[law]
+        s_creep = self._creep(values)
+        s_d_c = -1*np.fmin(sigma_byerlee(self.material, z, 'compression'),
+                           s_creep)
+        s_d_e = np.fmin(sigma_byerlee(self.material, z, 'extension'), s_creep)
+        return s_d_c[()], s_d_e[()], values['viscosity'][()]
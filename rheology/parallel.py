@@ -0,0 +1,145 @@
+"""
+Process-pool execution of the strength and viscosity computation.
+"""
+import os
+from collections import deque
+from multiprocessing import Pool
+import numpy as np
+from .lib import material_table, compute_mixed, unique_keys
+
+# MaterialTable installed in a worker process by _init_worker()
+_WORKER_TABLE = None
+
+
+def _init_worker(table):
+    global _WORKER_TABLE
+    _WORKER_TABLE = table
+
+
+def worker_table():
+    """
+    Return the MaterialTable shared with this worker process. Outside of a
+    pool this is material_table().
+    """
+    if _WORKER_TABLE is None:
+        return material_table()
+    return _WORKER_TABLE
+
+
+def imap_ordered(func, iterable, workers=None, table=None, max_pending=None):
+    """
+    Apply func to every item of iterable in a pool of worker processes and
+    yield the results in input order. Every worker receives the material
+    table once at start-up, tasks can access it with worker_table().
+
+    Parameters
+    ----------
+    func : callable
+        Module level function taking one item
+    iterable : iterable
+        Items to process. It is consumed lazily.
+    workers : int
+        Number of worker processes. None uses os.cpu_count(). With 1 the
+        items are processed in the calling process.
+    table : MaterialTable
+        Table shared with the workers. Defaults to material_table().
+    max_pending : int
+        Maximum number of items in flight, default 2*workers. Bounds the
+        memory when iterable streams from a file.
+
+    Yields
+    ------
+    result
+        func(item) for every item, in order
+    """
+    global _WORKER_TABLE
+    if workers is None:
+        workers = os.cpu_count()
+    if table is None:
+        table = material_table()
+    if workers <= 1:
+        previous = _WORKER_TABLE
+        _WORKER_TABLE = table
+        try:
+            for item in iterable:
+                yield func(item)
+        finally:
+            _WORKER_TABLE = previous
+        return
+    if max_pending is None:
+        max_pending = 2*workers
+    with Pool(workers, initializer=_init_worker, initargs=(table,)) as pool:
+        pending = deque()
+        for item in iterable:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def _mixed_task(args):
+    mat_idx, z, T, strain_rate, compute, log_viscosity, dedup = args
+    unique = unique_keys(mat_idx, T) if dedup else None
+    result = compute_mixed(mat_idx, z, T, strain_rate, worker_table(),
+                           compute, log_viscosity, unique)
+    return result, len(T) if unique is None else len(unique[0])
+
+
+def compute_parallel(mat_idx, z, T, strain_rate, table=None, compute=None,
+                     workers=None, chunksize=100000, log_viscosity=False,
+                     dedup=False):
+    """
+    Parallel version of compute_mixed(). The points are split into blocks
+    of chunksize points which are evaluated by a pool of worker processes
+    and reassembled in the original order.
+
+    Parameters
+    ----------
+    mat_idx : np.ndarray
+        Integer material index per point, negative for no material
+    z : np.ndarray
+        Depth in positive m
+    T : np.ndarray
+        Temperature in Kelvin
+    strain_rate : float
+        Strain rate in 1/s
+    table : MaterialTable
+        Defaults to material_table().
+    compute : list
+        Creep processes, see sigma_d().
+    workers : int
+        Number of worker processes. None uses os.cpu_count().
+    chunksize : int
+        Number of points per task
+    log_viscosity : bool
+        Return log10 of the effective viscosity, see compute_mixed().
+    dedup : bool
+        Evaluate creep and viscosity once per distinct (material,
+        temperature) pair of every block, see unique_keys().
+
+    Returns
+    -------
+    s_d_c, s_d_e, eff_vis : np.ndarray
+        See compute_mixed()
+    nkeys : int
+        Number of distinct keys evaluated, summed over the blocks; the
+        number of points without dedup
+    """
+    mat_idx, z, T = np.broadcast_arrays(np.atleast_1d(mat_idx),
+                                        np.atleast_1d(z), np.atleast_1d(T))
+    n = len(z)
+    starts = range(0, n, chunksize)
+    tasks = ((mat_idx[i:i+chunksize], z[i:i+chunksize], T[i:i+chunksize],
+              strain_rate, compute, log_viscosity, dedup) for i in starts)
+    s_d_c = np.empty(n)
+    s_d_e = np.empty(n)
+    eff_vis = np.empty(n)
+    nkeys = 0
+    results = imap_ordered(_mixed_task, tasks, workers, table)
+    for i, ((c, e, v), k) in zip(starts, results):
+        s_d_c[i:i+len(c)] = c
+        s_d_e[i:i+len(c)] = e
+        eff_vis[i:i+len(c)] = v
+        nkeys += k
+    return s_d_c, s_d_e, eff_vis, nkeys
@@ -0,0 +1,910 @@
+"""
+Strength and viscosity pipelines for model files.
+"""
+import io
+import os
+import numpy as np
+from contextlib import ExitStack
+from datetime import date
+from .lib import material_table, yield_strength_envelope
+from .lib import log10_effective_viscosity, unique_keys
+from .lib import yield_strength_sweep, compare_materials
+from .lib import sigma_byerlee, sigma_creep
+from .lib import classify_density, LITMOD_DENSITY_RULES
+from .io import read_blocks, read_columns, open_writer, is_npy
+from .io import load_table, NpyWriter
+from .io import parse_text, iter_raw_lines, V2RHOT_COLUMNS, ENGINES
+from .parallel import imap_ordered, worker_table, compute_parallel
+from .jit import compute_fused
+from .lookup import StrengthTable
+from .columns import Columns, elastic_thickness
+from .timing import RunReport, NullReport, report_path
+from .cache import ResultCache, file_digest, CACHE_DIR, CACHE_BUDGET
+
+# Column header of the V2RhoT output files
+V2RHOT_HEADER = "#x(km) y(km) depth(km) Pressure(bar) Temperature(oC) " \
+                "Density(kg/m3) Vp(km/s) Vs(km/s) Vs_diff(%) Pseudo-melts(%) " \
+                "dsigma_c(Pascal) dsigma_e(Pascal) Viscosity(log10Pas)"
+V2RHOT_FMT = '%10.3f'
+# Input columns the computation needs: depth and temperature
+V2RHOT_USECOLS = (V2RHOT_COLUMNS.index('depth'),
+                  V2RHOT_COLUMNS.index('temperature'))
+# Rows per task when a fully loaded file is split across worker processes
+PARALLEL_BLOCK = 100000
+# Columns of LitMod post-processing files: depth (km), temperature (C)
+# and density (kg/m3)
+LITMOD_COLUMNS = (1, 2, 6)
+# Arrays written by run_v2rhot_comparison(): coordinates of the points and
+# one column per material of the results
+COMPARISON_ARRAYS = ('points', 'dsigma_c', 'dsigma_e', 'viscosity')
+# Column header and formats of strength map files
+STRENGTH_MAP_HEADER = "#x(km) y(km) strength_c(N/m) strength_e(N/m)"
+MAP_FMT = ['%10.3f', '%10.3f', '%.6e', '%.6e']
+# Column header and formats of brittle-ductile transition files
+TRANSITION_HEADER = "#x(km) y(km) depth(km) direction"
+TRANSITION_FMT = ['%10.3f', '%10.3f', '%10.3f', '%2d']
+# Column header and formats of elastic thickness maps
+TE_HEADER = "#x(km) y(km) Te(km)"
+TE_FMT = '%10.3f'
+
+
+def v2rhot_meta_data(inputfile, outputfile, rheology_law, strain_rate,
+                     lookup=None):
+    """
+    Comment block written on top of V2RhoT output files. With a
+    StrengthTable lookup its maximum relative errors are recorded.
+    """
+    meta_data = "#Created on: " + str(date.today()) + "\n#Input file is: " \
+        + str(inputfile) + "\n#Output file is: " \
+        + os.path.basename(str(outputfile)) + "\n#Material is: " \
+        + str(rheology_law) + "\n#Strain rate is :" + str(strain_rate) \
+        + "\n"
+    if lookup is not None:
+        meta_data += "#Lookup table max relative error: creep %.3e, " \
+            "viscosity %.3e\n" % (lookup.max_rel_error['creep'],
+                                  lookup.max_rel_error['viscosity'])
+    return meta_data + "#\n"
+
+
+def v2rhot_header(strain_rate):
+    """
+    Column header of V2RhoT output files. For a sequence of strain rates
+    the three result columns are repeated for every rate, tagged with it.
+    """
+    if np.ndim(strain_rate) == 0:
+        return V2RHOT_HEADER
+    names = V2RHOT_HEADER.split()[:-3]
+    for rate in strain_rate:
+        names += ['dsigma_c@%g(Pascal)' % rate, 'dsigma_e@%g(Pascal)' % rate,
+                  'Viscosity@%g(log10Pas)' % rate]
+    return ' '.join(names)
+
+
+def v2rhot_strength(depth, temp, mat, strain_rate, unique=None, lookup=None,
+                    fused=False, table=None):
+    """
+    Compute the result columns of the V2RhoT pipeline.
+
+    Parameters
+    ----------
+    depth : np.ndarray
+        Depth in km
+    temp : np.ndarray
+        Temperature in C
+    mat : dict
+        Material as returned by MaterialTable.material()
+    strain_rate : float or sequence of float
+        Strain rate in 1/s. A sequence is evaluated in one broadcast pass
+        with yield_strength_sweep().
+    unique : tuple
+        (first, inverse) from unique_keys(temp), evaluates creep and
+        viscosity once per distinct temperature
+    lookup : StrengthTable
+        Table of mat at strain_rate the results are interpolated from
+        instead of evaluating the flow laws, see rheology.lookup
+    fused : bool
+        Evaluate all points in one compiled loop, see
+        rheology.jit.compute_fused(). Takes a single strain rate and
+        ignores unique.
+    table : MaterialTable
+        Table holding mat for fused. Defaults to material_table().
+
+    Returns
+    -------
+    out : np.ndarray
+        2D array with the columns dsigma_c (Pa), dsigma_e (Pa) and log10 of
+        the effective viscosity (Pa s), repeated for every strain rate
+    """
+    T = temp + 273
+    if lookup is not None:
+        return np.column_stack(lookup(depth*1e3, T))
+    if fused:
+        if table is None:
+            table = material_table()
+        mat_idx = np.full(len(T), table.index(mat['name']), dtype=np.intp)
+        return np.column_stack(compute_fused(mat_idx, depth*1e3, T,
+                                             strain_rate, table,
+                                             log_viscosity=True))
+    if np.ndim(strain_rate) == 0:
+        dsigma_c, dsigma_e = yield_strength_envelope(mat, depth*1e3, T,
+                                                     strain_rate,
+                                                     unique=unique)
+        if unique is None:
+            log_vis = log10_effective_viscosity(mat, T, strain_rate)
+        else:
+            first, inverse = unique
+            log_vis = log10_effective_viscosity(mat, T[first],
+                                                strain_rate)[inverse]
+        return np.column_stack((dsigma_c, dsigma_e, log_vis))
+    dsigma_c, dsigma_e, log_vis = yield_strength_sweep(
+        mat, depth*1e3, T, strain_rate, log_viscosity=True, unique=unique)
+    out = np.stack((dsigma_c, dsigma_e, log_vis), axis=2)
+    return out.reshape(len(T), -1)
+
+
+def v2rhot_chunk(data, mat, strain_rate, dedup=False, lookup=None,
+                 fused=False, table=None):
+    """
+    Compute strength and viscosity for rows of a V2RhoT file.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        2D array with the V2RhoT columns x, y, depth (km), pressure,
+        temperature (C), density, ...
+    mat : dict
+        Material as returned by MaterialTable.material()
+    strain_rate : float
+        Strain rate in 1/s
+    dedup : bool
+        Evaluate creep and viscosity once per distinct temperature, see
+        unique_keys()
+    lookup : StrengthTable
+        Interpolate the results from a table, see v2rhot_strength()
+    fused, table
+        Evaluate in one compiled loop, see v2rhot_strength()
+
+    Returns
+    -------
+    out : np.ndarray
+        data with dsigma_c (Pa), dsigma_e (Pa) and log10 of the effective
+        viscosity (Pa s) appended as columns
+    nkeys : int
+        Number of distinct temperatures evaluated, the number of rows
+        without dedup
+    """
+    unique = unique_keys(data[:, 4]) if dedup and not fused else None
+    out = np.column_stack((data, v2rhot_strength(data[:, 2], data[:, 4], mat,
+                                                 strain_rate, unique, lookup,
+                                                 fused, table)))
+    return out, len(data) if unique is None else len(unique[0])
+
+
+def v2rhot_passthrough_chunk(raw, mat, strain_rate, engine=None,
+                             dedup=False, lookup=None, fused=False,
+                             table=None):
+    """
+    Like v2rhot_chunk(), but working on the unparsed lines of a V2RhoT
+    text file. Only depth and temperature are parsed; the input columns
+    are copied to the output verbatim and the result columns are appended.
+
+    Parameters
+    ----------
+    raw : bytes
+        Data lines of a V2RhoT file, see rheology.io.iter_raw_lines()
+    mat : dict
+        Material as returned by MaterialTable.material()
+    strain_rate : float
+        Strain rate in 1/s
+    engine : str
+        Text parser, see rheology.io.parse_text()
+    dedup : bool
+        Evaluate creep and viscosity once per distinct temperature
+    lookup : StrengthTable
+        Interpolate the results from a table, see v2rhot_strength()
+    fused, table
+        Evaluate in one compiled loop, see v2rhot_strength()
+
+    Returns
+    -------
+    out : bytes
+        Output lines
+    nkeys : int
+        Number of distinct temperatures evaluated, see v2rhot_chunk()
+    """
+    cols = parse_text(raw, usecols=V2RHOT_USECOLS, engine=engine)
+    unique = unique_keys(cols[:, 1]) if dedup and not fused else None
+    result = v2rhot_strength(cols[:, 0], cols[:, 1], mat, strain_rate, unique,
+                             lookup, fused, table)
+    buf = io.BytesIO()
+    np.savetxt(buf, result, delimiter=',', fmt=V2RHOT_FMT)
+    out = b''.join(line + b',' + res for line, res in
+                   zip(raw.splitlines(), buf.getvalue().splitlines(True)))
+    return out, len(cols) if unique is None else len(unique[0])
+
+
+def _v2rhot_task(args):
+    data, rheology_law, strain_rate, dedup, lookup, fused = args
+    table = worker_table()
+    return v2rhot_chunk(data, table.material(rheology_law), strain_rate,
+                        dedup=dedup, lookup=lookup, fused=fused, table=table)
+
+
+def _v2rhot_passthrough_task(args):
+    raw, rheology_law, strain_rate, engine, dedup, lookup, fused = args
+    table = worker_table()
+    return v2rhot_passthrough_chunk(raw, table.material(rheology_law),
+                                    strain_rate, engine=engine, dedup=dedup,
+                                    lookup=lookup, fused=fused, table=table)
+
+
+def run_v2rhot(inputfile, outputfile, rheology_law, strain_rate,
+               chunksize=None, workers=1, engine=None, passthrough=False,
+               dedup=False, report=False, table=None, cache=None,
+               lookup=False, fused=False):
+    """
+    Compute strength and viscosity for a V2RhoT file and write the result.
+
+    Input and output may be comma separated text or binary .npy files, see
+    rheology.io. Binary input is memory-mapped. For binary output the
+    comment header is written to a text file next to it, with the
+    extension replaced by '_meta.txt'.
+
+    Parameters
+    ----------
+    inputfile : str
+        Comma separated V2RhoT file or its .npy conversion
+    outputfile : str
+        Path of the output file
+    rheology_law : str
+        Material name, see materials()
+    strain_rate : float or sequence of float
+        Strain rate in 1/s. For a sequence, the result columns are written
+        for every strain rate, see v2rhot_strength().
+    chunksize : int
+        If given, stream the input in blocks of chunksize rows and append
+        each result block to the output, so that memory is bounded by the
+        block size. If None the whole file is loaded at once.
+    workers : int
+        Number of worker processes computing blocks in parallel. None uses
+        os.cpu_count(). Rows are written in input order.
+    engine : str
+        Text parser, see rheology.io.parse_text()
+    passthrough : bool
+        Only for text input and output. Parse just depth and temperature
+        and copy the input columns to the output as they are written in
+        the input file, instead of parsing and reformatting all of them.
+    dedup : bool
+        Evaluate creep and viscosity once per distinct temperature of
+        every block and scatter the results to all rows, see
+        unique_keys(). Depth only enters Byerlee's law, which is cheaper
+        to evaluate than to deduplicate.
+    report : bool
+        Record wall time, rows, points/s and peak RSS of the read, compute
+        and write stages and write them as JSON next to the output file,
+        with the extension replaced by '_report.json'. See
+        rheology.timing.RunReport. With workers, compute is the time spent
+        waiting for results.
+    table : MaterialTable
+        Table the material is looked up in and shared with the worker
+        processes. Defaults to material_table().
+    cache : ResultCache or str
+        Result cache or its directory, see rheology.cache. The result
+        columns are looked up under a hash of the input file content, the
+        material parameters, the strain rate and the code version; on a
+        hit the input is only read and written with the cached columns
+        appended, on a miss the computed columns are stored. Not
+        supported with passthrough.
+    lookup : bool or StrengthTable
+        Interpolate the results from a StrengthTable of the material at
+        strain_rate instead of evaluating the flow laws, see
+        rheology.lookup. True builds the table with the default settings.
+        Its maximum relative errors are written to the comment header and
+        the report. Takes a single strain rate and does not combine with
+        dedup or fused.
+    fused : bool
+        Evaluate every block in one compiled loop, see
+        rheology.jit.compute_fused(). Takes a single strain rate and
+        ignores dedup.
+
+    Returns
+    -------
+    nrows : int
+        Number of rows written
+    nkeys : int
+        Number of distinct keys evaluated; nrows/nkeys is the dedup ratio.
+        0 if the results were taken from the cache.
+    """
+    if table is None:
+        table = material_table()
+    table.index(rheology_law)  # fail early on unknown names
+    if cache is not None and passthrough:
+        raise ValueError('The result cache does not support passthrough')
+    if fused and np.ndim(strain_rate) != 0:
+        raise ValueError('fused takes a single strain rate', strain_rate)
+    if lookup is False:
+        lookup = None
+    if lookup is not None:
+        if np.ndim(strain_rate) != 0 or dedup or fused:
+            raise ValueError('lookup takes a single strain rate and neither '
+                             'dedup nor fused')
+        if lookup is True:
+            lookup = StrengthTable(table.material(rheology_law), strain_rate)
+    meta_data = v2rhot_meta_data(inputfile, outputfile, rheology_law,
+                                 strain_rate, lookup)
+    header = v2rhot_header(strain_rate)
+    if chunksize is None and workers != 1:
+        chunksize = PARALLEL_BLOCK
+    if report:
+        timing = RunReport({'inputfile': str(inputfile),
+                            'outputfile': str(outputfile),
+                            'material': rheology_law,
+                            'strain_rate': strain_rate,
+                            'chunksize': chunksize, 'workers': workers,
+                            'passthrough': passthrough, 'dedup': dedup,
+                            'fused': fused,
+                            'lookup_max_rel_error': None if lookup is None
+                            else {law: float(error) for law, error
+                                  in lookup.max_rel_error.items()}})
+    else:
+        timing = NullReport()
+    if passthrough:
+        if is_npy(inputfile) or is_npy(outputfile):
+            raise ValueError('passthrough requires text input and output')
+        blocks = timing.iterate('read', iter_raw_lines(inputfile, chunksize),
+                                rows=lambda raw: raw.count(b'\n'))
+        tasks = ((raw, rheology_law, strain_rate, engine, dedup, lookup,
+                  fused) for raw in blocks)
+        nrows = nkeys = 0
+        with open(outputfile, 'wb') as f:
+            f.write((meta_data + header + '\n').encode())
+            for out, n in timing.iterate(
+                    'compute', imap_ordered(_v2rhot_passthrough_task, tasks,
+                                            workers, table),
+                    rows=lambda result: result[0].count(b'\n')):
+                rows = out.count(b'\n')
+                with timing.stage('write', rows):
+                    f.write(out)
+                nrows += rows
+                nkeys += n
+        timing.write(report_path(outputfile))
+        return nrows, nkeys
+    if is_npy(outputfile):
+        with open(os.path.splitext(outputfile)[0] + '_meta.txt', 'w') as f:
+            f.write(meta_data + header + '\n')
+    blocks = timing.iterate('read', read_blocks(inputfile, chunksize,
+                                                engine=engine))
+    cached = None
+    if cache is not None:
+        if isinstance(cache, str):
+            cache = ResultCache(cache)
+        with timing.stage('cache_lookup'):
+            # interpolated results are only reused for the same table
+            table_key = dict() if lookup is None else \
+                dict(lookup=(lookup.temp_range, lookup.size, lookup.compute))
+            key = cache.key(input=file_digest(inputfile),
+                            material=table.material(rheology_law),
+                            strain_rate=strain_rate, **table_key)
+            cached = cache.get(key)
+    if cached is not None:
+        with open_writer(outputfile, header=header, comments=meta_data,
+                         fmt=V2RHOT_FMT) as writer:
+            for block in blocks:
+                with timing.stage('write', len(block)):
+                    i = writer.nrows
+                    writer.write(np.column_stack(
+                        (block, cached[i:i+len(block)])))
+        timing.write(report_path(outputfile))
+        return writer.nrows, 0
+    ncols = 3*max(np.size(strain_rate), 1)
+    tasks = ((block, rheology_law, strain_rate, dedup, lookup, fused)
+             for block in blocks)
+    nkeys = 0
+    with ExitStack() as stack:
+        writer = stack.enter_context(open_writer(
+            outputfile, header=header, comments=meta_data, fmt=V2RHOT_FMT))
+        store = None if cache is None else \
+            stack.enter_context(cache.writer(key))
+        for out, n in timing.iterate('compute',
+                                     imap_ordered(_v2rhot_task, tasks,
+                                                  workers, table),
+                                     rows=lambda result: len(result[0])):
+            with timing.stage('write', len(out)):
+                writer.write(out)
+                if store is not None:
+                    store.write(out[:, -ncols:])
+            nkeys += n
+    timing.write(report_path(outputfile))
+    return writer.nrows, nkeys
+
+
+def run_v2rhot_comparison(inputfile, outputdir, strain_rate, materials=None,
+                          chunksize=100000, engine=None):
+    """
+    Evaluate several materials for the points of a V2RhoT file, see
+    compare_materials(). The input is read and evaluated in blocks of
+    chunksize points and every block is appended to .npy files in
+    outputdir, so that memory is bounded by len(materials)*chunksize
+    whatever the size of the input. Only the x, y, depth and temperature
+    columns of the input are read.
+
+    outputdir holds 'materials.txt', the material names one per line, and
+    the .npy files 'points' with the columns x, y and depth (km), and
+    'dsigma_c', 'dsigma_e' (Pa) and 'viscosity' (log10 Pa s) with one row
+    per point and one column per material. See read_comparison().
+
+    Parameters
+    ----------
+    inputfile : str
+        Comma separated V2RhoT file or its .npy conversion
+    outputdir : str
+        Output directory, created if needed
+    strain_rate : float
+        Strain rate in 1/s
+    materials : list of str
+        Material names. Default is the whole database.
+    chunksize : int
+        Number of points read and evaluated at a time
+    engine : str
+        Text parser, see rheology.io.parse_text()
+
+    Returns
+    -------
+    npoints : int
+        Number of points evaluated
+    """
+    table = material_table()
+    if materials is None:
+        materials = table.names
+    table.index(materials)  # fail early on unknown names
+    os.makedirs(outputdir, exist_ok=True)
+    meta_data = v2rhot_meta_data(inputfile, outputdir, ' '.join(materials),
+                                 strain_rate)
+    with open(os.path.join(outputdir, 'materials.txt'), 'w') as f:
+        f.write(meta_data + ''.join(name + '\n' for name in materials))
+    usecols = [V2RHOT_COLUMNS.index(name)
+               for name in ('x', 'y', 'depth', 'temperature')]
+    with ExitStack() as stack:
+        writers = [stack.enter_context(NpyWriter(
+            os.path.join(outputdir, name + '.npy')))
+            for name in COMPARISON_ARRAYS]
+        for block in read_blocks(inputfile, chunksize, usecols=usecols,
+                                 engine=engine):
+            results = compare_materials(
+                block[:, 2]*1e3, block[:, 3] + 273, strain_rate,
+                names=materials, table=table, chunksize=chunksize,
+                log_viscosity=True)
+            writers[0].write(block[:, :3])
+            for writer, result in zip(writers[1:], results):
+                writer.write(result.T)
+    return writers[0].nrows
+
+
+def read_comparison(outputdir):
+    """
+    Load the output of run_v2rhot_comparison(). The arrays are
+    memory-mapped read-only.
+
+    Returns
+    -------
+    data : dict
+        'materials', a list of names, and the arrays of COMPARISON_ARRAYS
+    """
+    with open(os.path.join(outputdir, 'materials.txt')) as f:
+        data = {'materials': [line.strip() for line in f
+                              if line.strip() and not line.startswith('#')]}
+    for name in COMPARISON_ARRAYS:
+        data[name] = np.load(os.path.join(outputdir, name + '.npy'),
+                             mmap_mode='r')
+    return data
+
+
+def litmod_strength(data, strain_rate, rules=LITMOD_DENSITY_RULES,
+                    table=None, dedup=False, workers=1, fused=False):
+    """
+    Compute strength and viscosity for the rows of a LitMod
+    post-processing table, assigning the material of every row from its
+    density, see classify_density(). This is the computation of the LitMod
+    driver.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        2D array with depth (km), temperature (C) and density (kg/m3) in
+        the columns LITMOD_COLUMNS
+    strain_rate : float
+        Strain rate in 1/s
+    rules : list
+        Density rules, see LITMOD_DENSITY_RULES
+    table : MaterialTable
+        Defaults to material_table().
+    dedup : bool
+        Evaluate creep and viscosity once per distinct (material,
+        temperature), see unique_keys()
+    workers : int
+        Number of worker processes, see compute_parallel(). None uses
+        os.cpu_count().
+    fused : bool
+        Evaluate all points in one compiled loop instead, see
+        rheology.jit.compute_fused(). Ignores workers and dedup.
+
+    Returns
+    -------
+    out : np.ndarray
+        data with dsigma_c (Pa), dsigma_e (Pa) and the natural logarithm
+        of the effective viscosity (Pa s) appended as columns
+    mat_idx : np.ndarray
+        Material index of every row, negative where no rule matched; the
+        results of these rows are NaN
+    nkeys : int
+        Number of distinct keys evaluated, see compute_parallel()
+    """
+    if table is None:
+        table = material_table()
+    depth, temp, density = (data[:, i] for i in LITMOD_COLUMNS)
+    mat_idx = classify_density(density, rules, table)
+    T = temp + 273
+    if fused:
+        dsigma_c, dsigma_e, log_vis = compute_fused(
+            mat_idx, depth*1000, T, strain_rate, table, log_viscosity=True)
+        nkeys = len(T)
+    else:
+        dsigma_c, dsigma_e, log_vis, nkeys = compute_parallel(
+            mat_idx, depth*1000, T, strain_rate, table, workers=workers,
+            log_viscosity=True, dedup=dedup)
+    out = np.column_stack((data, dsigma_c, dsigma_e, log_vis*np.log(10)))
+    return out, mat_idx, nkeys
+
+
+def run_litmod(inputfile, outputfile, strain_rate, rules=LITMOD_DENSITY_RULES,
+               dedup=False, workers=1, fused=False, report=False, table=None,
+               cache=None):
+    """
+    Compute strength and viscosity for a whitespace delimited LitMod
+    post-processing file and write the input with the result columns
+    appended, as the LitMod driver does, see litmod_strength().
+
+    The result columns can be cached as in run_v2rhot(), keyed by the
+    input file content, the rules, the parameters of their materials, the
+    strain rate and the code version. rules, dedup, workers and fused are
+    passed on to litmod_strength().
+
+    Returns
+    -------
+    nrows : int
+        Number of rows written
+    unmatched : int
+        Number of rows no density rule matched
+    """
+    if table is None:
+        table = material_table()
+    timing = RunReport({'inputfile': str(inputfile),
+                        'outputfile': str(outputfile),
+                        'strain_rate': strain_rate, 'dedup': dedup,
+                        'workers': workers, 'fused': fused}) \
+        if report else NullReport()
+    with timing.stage('read') as stage:
+        data = load_table(inputfile, delimiter=None)
+        stage.rows = len(data)
+    cached = None
+    if cache is not None:
+        if isinstance(cache, str):
+            cache = ResultCache(cache)
+        with timing.stage('cache_lookup'):
+            key = cache.key(input=file_digest(inputfile), rules=rules,
+                            materials=[table.material(name)
+                                       for name, code in rules],
+                            strain_rate=strain_rate)
+            cached = cache.get(key)
+    with timing.stage('compute', len(data)):
+        if cached is None:
+            out, mat_idx, nkeys = litmod_strength(data, strain_rate, rules,
+                                                  table, dedup, workers,
+                                                  fused)
+            unmatched = int(np.count_nonzero(mat_idx < 0))
+            if cache is not None:
+                cache.put(key, out[:, -3:])
+        else:
+            out = np.column_stack((data, cached))
+            unmatched = int(np.count_nonzero(
+                classify_density(data[:, LITMOD_COLUMNS[2]], rules,
+                                 table) < 0))
+    with timing.stage('write', len(out)):
+        with open_writer(outputfile, delimiter=' ') as writer:
+            writer.write(out)
+    timing.write(report_path(outputfile))
+    return len(out), unmatched
+
+
+def read_v2rhot_result(path, rate_index=0, engine=None):
+    """
+    Load the coordinates and strength envelopes of a run_v2rhot() output.
+
+    Parameters
+    ----------
+    path : str
+        Text or .npy output of run_v2rhot()
+    rate_index : int
+        Strain rate to load from files written for several strain rates
+    engine : str
+        Text parser, see rheology.io.parse_text()
+
+    Returns
+    -------
+    data : dict
+        1D arrays 'x', 'y', 'depth' (km), 'dsigma_c' and 'dsigma_e' (Pa)
+    """
+    first = len(V2RHOT_COLUMNS) + 3*rate_index
+    names = ('x', 'y', 'depth', 'dsigma_c', 'dsigma_e')
+    data = load_table(path, usecols=(0, 1, 2, first, first + 1),
+                      engine=engine)
+    return {name: data[:, i] for i, name in enumerate(names)}
+
+
+def strength_map(x, y, depth, dsigma_c, dsigma_e):
+    """
+    Integrate the strength envelopes over depth in every (x, y) column of
+    a model, see Columns.integrate().
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Horizontal coordinates of every point
+    depth : np.ndarray
+        Depth in km
+    dsigma_c, dsigma_e : np.ndarray
+        Differential stress in compression and extension in Pa
+
+    Returns
+    -------
+    out : np.ndarray
+        2D array with the columns x, y, integrated strength in compression
+        and in extension (N/m), one row per (x, y) column
+    """
+    cols = Columns(x, y, np.asarray(depth)*1e3)
+    strength = cols.integrate(np.column_stack((dsigma_c, dsigma_e)))
+    return np.column_stack((cols.x, cols.y, strength))
+
+
+def run_strength_map(resultfile, mapfile, rate_index=0, engine=None):
+    """
+    Write the map of the vertically integrated strength of a run_v2rhot()
+    output, see strength_map(). The map is a text file with one row per
+    (x, y) column, or a .npy file.
+
+    Returns
+    -------
+    ncolumns : int
+        Number of (x, y) columns
+    """
+    data = read_v2rhot_result(resultfile, rate_index, engine=engine)
+    out = strength_map(data['x'], data['y'], data['depth'],
+                       data['dsigma_c'], data['dsigma_e'])
+    meta_data = "#Created on: " + str(date.today()) + "\n#Input file is: " \
+        + str(resultfile) + "\n#\n"
+    with open_writer(mapfile, header=STRENGTH_MAP_HEADER, comments=meta_data,
+                     fmt=MAP_FMT) as writer:
+        writer.write(out)
+    return len(out)
+
+
+def transition_depths(depth, temp, mat, strain_rate, x=None, y=None,
+                      mode='compression', compute=None):
+    """
+    Depths of the brittle-ductile transitions, where Byerlee's law and
+    the creep stress cross, in every (x, y) column of a model or in a 1D
+    profile. See Columns.crossings().
+
+    Parameters
+    ----------
+    depth : np.ndarray
+        Depth in km
+    temp : np.ndarray
+        Temperature in C
+    mat : dict or CompiledMaterial
+        Material as returned by MaterialTable.material(), or a material
+        per point for layered models, e.g. table.compiled(mat_idx)
+    strain_rate : float
+        Strain rate in 1/s
+    x, y : np.ndarray
+        Horizontal coordinates of every point. None for a 1D profile.
+    mode : str
+        Byerlee's law for 'compression' or 'extension'
+    compute : list
+        Creep processes, see sigma_d().
+
+    Returns
+    -------
+    out : np.ndarray
+        2D array with the columns x, y, depth (km) and direction of every
+        transition, sorted by column and depth. Direction is 1 from
+        brittle above to ductile below and -1 from ductile to brittle.
+    """
+    cols = Columns(x, y, depth)
+    depth = np.asarray(depth, dtype=float)
+    with np.errstate(over='ignore'):
+        s_creep = sigma_creep(mat, np.asarray(temp) + 273, strain_rate,
+                              compute)
+    column, z, direction = cols.crossings(
+        sigma_byerlee(mat, depth*1e3, mode), s_creep)
+    return np.column_stack((cols.x[column], cols.y[column], z, direction))
+
+
+def run_transitions(inputfile, outputfile, rheology_law, strain_rate,
+                    mode='compression', engine=None):
+    """
+    Write the brittle-ductile transitions of every (x, y) column of a
+    V2RhoT file, see transition_depths(). Only x, y, depth and
+    temperature are read, so the input may also be a run_v2rhot() output.
+
+    Returns
+    -------
+    ntransitions : int
+        Number of transitions found
+    """
+    mat = material_table().material(rheology_law)
+    cols = read_columns(inputfile, ('x', 'y', 'depth', 'temperature'),
+                        engine=engine)
+    out = transition_depths(cols['depth'], cols['temperature'], mat,
+                            strain_rate, x=cols['x'], y=cols['y'], mode=mode)
+    meta_data = v2rhot_meta_data(inputfile, outputfile, rheology_law,
+                                 strain_rate)
+    with open_writer(outputfile, header=TRANSITION_HEADER,
+                     comments=meta_data, fmt=TRANSITION_FMT) as writer:
+        writer.write(out)
+    return len(out)
+
+
+def run_elastic_thickness(resultfile, outputfile, curvature=None,
+                          moment=None, coupled=False, rate_index=0,
+                          engine=None):
+    """
+    Write the map of the effective elastic thickness of a run_v2rhot()
+    output, computed from the strength envelopes of every (x, y) column,
+    see rheology.columns.elastic_thickness().
+
+    Parameters
+    ----------
+    resultfile : str
+        Text or .npy output of run_v2rhot()
+    outputfile : str
+        Text or .npy map with the columns x, y and Te (km)
+    curvature : float
+        Plate curvature in 1/m
+    moment : float
+        Bending moment in N, instead of curvature
+    coupled : bool
+        Treat the competent layers of a column as welded together
+
+    Returns
+    -------
+    ncolumns : int
+        Number of (x, y) columns
+    """
+    data = read_v2rhot_result(resultfile, rate_index, engine=engine)
+    cols = Columns(data['x'], data['y'], data['depth']*1e3)
+    te = elastic_thickness(cols, data['dsigma_c'], data['dsigma_e'],
+                           curvature=curvature, moment=moment,
+                           coupled=coupled)
+    meta_data = "#Created on: " + str(date.today()) + "\n#Input file is: " \
+        + str(resultfile) + "\n#Curvature is: " + str(curvature) \
+        + "\n#Moment is: " + str(moment) + "\n#Coupled layers: " \
+        + str(coupled) + "\n#\n"
+    with open_writer(outputfile, header=TE_HEADER, comments=meta_data,
+                     fmt=TE_FMT) as writer:
+        writer.write(np.column_stack((cols.x, cols.y, te/1e3)))
+    return len(cols)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Compute strength and viscosity for a V2RhoT file')
+    parser.add_argument('inputfile', help='comma separated or .npy input')
+    parser.add_argument('outputfile', help='text or .npy output, or a '
+                        'directory when comparing materials')
+    parser.add_argument('--material', nargs='+', default=['peridotite_dry'],
+                        help='rheology, see materials() in rheology/lib.py. '
+                        'Several names or "all" compare the materials and '
+                        'write .npy files to the directory outputfile.')
+    parser.add_argument('--strain-rate', type=float, nargs='+',
+                        default=[1e-15],
+                        help='one or more strain rates in 1/s')
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes, 0 for all CPU cores')
+    parser.add_argument('--engine', choices=ENGINES, default=None)
+    parser.add_argument('--passthrough', action='store_true')
+    parser.add_argument('--dedup', action='store_true',
+                        help='evaluate each distinct temperature once')
+    parser.add_argument('--fused', action='store_true',
+                        help='evaluate in one compiled loop, needs numba to '
+                        'be faster')
+    parser.add_argument('--lookup', action='store_true',
+                        help='interpolate the results from a table of the '
+                        'material, see rheology/lookup.py')
+    parser.add_argument('--cache', nargs='?', const=CACHE_DIR,
+                        metavar='DIR', help='reuse results computed before '
+                        'for the same input and settings, default '
+                        'directory %s' % CACHE_DIR)
+    parser.add_argument('--cache-budget', type=float, default=CACHE_BUDGET,
+                        help='maximum cache size in bytes')
+    parser.add_argument('--report', action='store_true',
+                        help='write per-stage timings to a JSON file next '
+                        'to the output')
+    parser.add_argument('--strength-map', metavar='MAPFILE',
+                        help='also write the depth integrated strength per '
+                        '(x, y) column')
+    parser.add_argument('--transitions', metavar='FILE',
+                        help='also write the brittle-ductile transition '
+                        'depths of every (x, y) column')
+    parser.add_argument('--te', metavar='FILE',
+                        help='also write the effective elastic thickness of '
+                        'every (x, y) column, needs --curvature or --moment')
+    parser.add_argument('--curvature', type=float,
+                        help='plate curvature in 1/m for --te')
+    parser.add_argument('--moment', type=float,
+                        help='bending moment in N for --te')
+    parser.add_argument('--coupled', action='store_true',
+                        help='weld the competent layers together for --te')
+    args = parser.parse_args()
+    if args.te and (args.curvature is None) == (args.moment is None):
+        parser.error('--te needs one of --curvature and --moment')
+    outdir = os.path.dirname(args.outputfile)
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+    strain_rate = args.strain_rate
+    if len(strain_rate) == 1:
+        strain_rate = strain_rate[0]
+    if len(args.material) > 1 or args.material == ['all']:
+        if np.ndim(strain_rate):
+            parser.error('comparing materials takes a single strain rate')
+        materials = None if args.material == ['all'] else args.material
+        run_v2rhot_comparison(args.inputfile, args.outputfile, strain_rate,
+                              materials=materials,
+                              chunksize=args.chunksize or 100000,
+                              engine=args.engine)
+    else:
+        cache = None if args.cache is None else \
+            ResultCache(args.cache, int(args.cache_budget))
+        if args.fused and np.ndim(strain_rate):
+            parser.error('--fused takes a single strain rate')
+        lookup = False
+        if args.lookup:
+            if np.ndim(strain_rate) or args.dedup or args.fused:
+                parser.error('--lookup takes a single strain rate and neither '
+                             '--dedup nor --fused')
+            lookup = StrengthTable(material_table().material(
+                args.material[0]), strain_rate)
+            print('Lookup table max relative error: creep %.3e, viscosity '
+                  '%.3e' % (lookup.max_rel_error['creep'],
+                            lookup.max_rel_error['viscosity']))
+        nrows, nkeys = run_v2rhot(args.inputfile, args.outputfile,
+                                  args.material[0], strain_rate,
+                                  chunksize=args.chunksize,
+                                  workers=args.workers or None,
+                                  engine=args.engine,
+                                  passthrough=args.passthrough,
+                                  dedup=args.dedup, report=args.report,
+                                  cache=cache, lookup=lookup,
+                                  fused=args.fused)
+        if cache is not None and nkeys == 0 and nrows:
+            print('Took the results of', nrows, 'rows from the cache')
+        elif args.dedup:
+            print('Evaluated', nkeys, 'distinct temperatures for', nrows,
+                  'rows, dedup ratio %.1f' % (nrows/max(nkeys, 1)))
+        if args.strength_map:
+            ncolumns = run_strength_map(args.outputfile, args.strength_map)
+            print('Wrote', ncolumns, 'columns to', args.strength_map)
+        if args.transitions:
+            if np.ndim(strain_rate):
+                parser.error('--transitions takes a single strain rate')
+            ntransitions = run_transitions(args.inputfile, args.transitions,
+                                           args.material[0], strain_rate)
+            print('Wrote', ntransitions, 'transitions to', args.transitions)
+        if args.te:
+            ncolumns = run_elastic_thickness(args.outputfile, args.te,
+                                             curvature=args.curvature,
+                                             moment=args.moment,
+                                             coupled=args.coupled)
+            print('Wrote', ncolumns, 'columns to', args.te)
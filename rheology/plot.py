@@ -0,0 +1,46 @@
+"""
+Plots of strength envelopes. matplotlib is imported on the first call.
+"""
+import numpy as np
+
+
+def plot_envelope(depth, dsigma_c, dsigma_e, temp=None, ax=None,
+                  depth_range=None):
+    """
+    Plot the strength envelopes against depth, optionally with the
+    geotherm on a second x axis.
+
+    Parameters
+    ----------
+    depth : np.ndarray
+        Depth in km
+    dsigma_c, dsigma_e : np.ndarray
+        Differential stress in compression and extension in Pa
+    temp : np.ndarray
+        Temperature in C
+    ax : matplotlib.axes.Axes
+        Axes to plot into. Default is a new figure.
+    depth_range : tuple of float
+        (top, bottom) depth in km shown
+
+    Returns
+    -------
+    ax, ax_temp : matplotlib.axes.Axes
+        Axes of the envelopes and of the geotherm, None without temp
+    """
+    import matplotlib.pyplot as plt
+    if ax is None:
+        ax = plt.figure().add_subplot(111)
+    depth = np.asarray(depth)
+    ax.plot(np.asarray(dsigma_c)/1e9, -depth)
+    ax.plot(np.asarray(dsigma_e)/1e9, -depth)
+    ax.set_xlabel("Strength (GPa)")
+    ax.set_ylabel("Depth (km)")
+    ax_temp = None
+    if temp is not None:
+        ax_temp = ax.twiny()
+        ax_temp.plot(temp, -depth, '-r', label='temp')
+        ax_temp.set_xlabel(r"Temperature ($^\circ$C)")
+    if depth_range is not None:
+        ax.set_ylim(-depth_range[1], -depth_range[0])
+    return ax, ax_temp
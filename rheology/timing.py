@@ -0,0 +1,174 @@
+"""
+Per-stage timing and throughput of pipeline runs.
+"""
+import os
+import sys
+import json
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss(children=False):
+    """
+    Peak resident set size in bytes of this process, or of its terminated
+    and waited-for child processes. None where the platform does not
+    report it.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    rss = resource.getrusage(who).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss if sys.platform == 'darwin' else rss*1024
+
+
+class RunReport(object):
+    """
+    Record wall time, rows processed and peak memory of the stages of a
+    run. A stage may be entered many times, e.g. once per block, and the
+    totals are accumulated. Stages may nest; the time of the inner stage
+    is not counted for the outer one, so that the stage times add up.
+
+    Peak RSS is the high-water mark of the process at the end of the
+    stage; it never decreases, so it attributes the peak to the first
+    stage reaching it.
+
+    Parameters
+    ----------
+    info : dict
+        Description of the run stored in the report, e.g. file names
+
+    Examples
+    --------
+    >>> report = RunReport({'inputfile': inputfile})
+    >>> with report.stage('compute', rows=len(data)):
+    ...     out = v2rhot_chunk(data, mat, strain_rate)
+    >>> report.write(outputfile)
+    """
+    enabled = True
+
+    def __init__(self, info=None):
+        self.info = dict() if info is None else dict(info)
+        self.stages = dict()
+        self._stack = list()
+        self._start = time.perf_counter()
+        self._created = datetime.now().isoformat(timespec='seconds')
+
+    def start(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self, rows=0):
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0,
+                                              'calls': 0})
+        stage['seconds'] += elapsed - nested
+        stage['rows'] += rows
+        stage['calls'] += 1
+        stage['peak_rss_bytes'] = peak_rss()
+
+    def stage(self, name, rows=0):
+        """
+        Context manager timing one pass through the stage name that
+        processes rows rows. If the rows are only known at the end, set
+        them as the attribute rows of the object returned on entering.
+        """
+        return _Stage(self, name, rows)
+
+    def iterate(self, name, iterable, rows=len):
+        """
+        Iterate over iterable, timing the production of every item as
+        stage name. rows(item) is the number of rows of an item.
+        """
+        iterator = iter(iterable)
+        while True:
+            self.start(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.stop()
+                return
+            self.stop(rows(item))
+            yield item
+
+    def to_dict(self):
+        """
+        The report as a dict of JSON types.
+        """
+        stages = list()
+        for name, stage in self.stages.items():
+            stage = dict(stage, name=name)
+            stage['points_per_s'] = stage['rows']/stage['seconds'] \
+                if stage['seconds'] > 0 else None
+            stages.append(stage)
+        report = dict(self.info)
+        report.update({'created': self._created,
+                       'wall_seconds': time.perf_counter() - self._start,
+                       'peak_rss_bytes': peak_rss(),
+                       'peak_rss_children_bytes': peak_rss(children=True),
+                       'stages': stages})
+        return report
+
+    def write(self, path):
+        """
+        Write the report as JSON to path.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, default=str)
+
+
+class _Stage(object):
+    def __init__(self, report, name, rows):
+        self.report = report
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.report.start(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.report.stop(self.rows)
+
+
+class NullReport(object):
+    """
+    Stand-in for RunReport when instrumentation is off. Every method does
+    nothing, iterate() returns the iterable itself.
+    """
+    enabled = False
+
+    def stage(self, name, rows=0):
+        return _NULL_STAGE
+
+    def iterate(self, name, iterable, rows=len):
+        return iterable
+
+    def write(self, path):
+        pass
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def report_path(outputfile):
+    """
+    Path of the run report written next to outputfile, with the extension
+    replaced by '_report.json'.
+    """
+    return os.path.splitext(str(outputfile))[0] + '_report.json'
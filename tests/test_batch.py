@@ -0,0 +1,94 @@
+"""
+Tests of the manifest batch runs in rheology.batch.
+"""
+import os
+import json
+import numpy as np
+import pytest
+from rheology.batch import load_manifest, run_batch, check_jobs, stamp_path
+from rheology.pipeline import V2RHOT_FMT
+from rheology.bench import synthetic_v2rhot, synthetic_litmod
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    np.savetxt(str(tmp_path/'model.dat'), synthetic_v2rhot(500),
+               delimiter=',', fmt=V2RHOT_FMT)
+    np.savetxt(str(tmp_path/'profile.dat'), synthetic_litmod(500),
+               fmt='%10.3f')
+    path = tmp_path/'manifest.json'
+    path.write_text(json.dumps(
+        {'defaults': {'strain_rate': 1e-15, 'chunksize': 200},
+         'jobs': [{'input': 'model.dat', 'material': 'peridotite_dry',
+                   'output': 'a/strength.txt'},
+                  {'input': 'profile.dat', 'rules': 'litmod',
+                   'output': 'b/strength.dat'}]}))
+    return str(path)
+
+
+def _statuses(jobs, **options):
+    return [result['status'] for result in run_batch(jobs, workers=1,
+                                                     **options)]
+
+
+def test_manifest_drops_defaults_a_job_does_not_take(manifest):
+    v2rhot, litmod = load_manifest(manifest)
+    assert v2rhot['chunksize'] == 200
+    assert 'chunksize' not in litmod
+    assert os.path.isabs(v2rhot['input'])
+
+
+def test_batch_skips_up_to_date_jobs(manifest):
+    jobs = load_manifest(manifest)
+    assert _statuses(jobs) == ['done', 'done']
+    assert all(os.path.exists(stamp_path(job['output'])) for job in jobs)
+    assert _statuses(jobs) == ['skipped', 'skipped']
+    # changed settings run the job again
+    jobs[1]['strain_rate'] = 1e-16
+    assert _statuses(jobs) == ['skipped', 'done']
+    assert _statuses(jobs) == ['skipped', 'skipped']
+    assert _statuses(jobs, force=True) == ['done', 'done']
+
+
+@pytest.mark.parametrize('change, error', [({'workers': 2}, ValueError),
+                                           ({'fmt': '%g'}, ValueError),
+                                           ({'material': 'unobtainium'},
+                                            KeyError)])
+def test_check_jobs_rejects_bad_jobs(manifest, change, error):
+    jobs = load_manifest(manifest)
+    jobs[0].update(change)
+    with pytest.raises(error):
+        check_jobs(jobs)
+    with pytest.raises(error):
+        list(run_batch(jobs, workers=1))
+    assert not os.path.exists(jobs[1]['output'])
+
+
+def test_check_jobs_rejects_shared_outputs(manifest):
+    jobs = load_manifest(manifest)
+    jobs[1]['output'] = jobs[0]['output']
+    with pytest.raises(ValueError):
+        check_jobs(jobs)
+
+
+def test_failed_job_keeps_earlier_output(manifest, tmp_path):
+    job = load_manifest(manifest)[0]
+    assert _statuses([job]) == ['done']
+    with open(job['output']) as f:
+        written = f.read()
+    # fails before opening the output
+    job.update(passthrough=True, cache=str(tmp_path/'cache'))
+    assert _statuses([job]) == ['failed']
+    with open(job['output']) as f:
+        assert f.read() == written
+    assert not os.path.exists(stamp_path(job['output']))
+
+
+def test_failed_job_removes_partial_output(manifest, tmp_path):
+    job = load_manifest(manifest)[0]
+    with open(job['input'], 'a') as f:
+        f.write('not,a,number\n')
+    results = list(run_batch([job], workers=1))
+    assert results[0]['status'] == 'failed' and results[0]['error']
+    assert not os.path.exists(job['output'])
+    assert not os.path.exists(stamp_path(job['output']))
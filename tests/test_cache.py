@@ -0,0 +1,44 @@
+"""
+Tests of the result cache in rheology.cache.
+"""
+import os
+import numpy as np
+from rheology.cache import ResultCache
+
+
+def test_get_returns_what_put_stored(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache.key(input='abc', strain_rate=1e-15)
+    assert key != cache.key(input='abc', strain_rate=1e-16)
+    assert cache.get(key) is None
+    cache.put(key, np.arange(12.0).reshape(4, 3))
+    np.testing.assert_array_equal(cache.get(key),
+                                  np.arange(12.0).reshape(4, 3))
+
+
+def test_evict_deletes_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    keys = [cache.key(entry=i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, np.full((100, 1), float(i)))
+        os.utime(cache.path(key), (1e9 + i, 1e9 + i))
+    # reading the oldest entry makes the second one the least recent
+    assert cache.get(keys[0]) is not None
+    size = os.path.getsize(cache.path(keys[0]))
+    assert cache.evict(2*size) == size
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+    assert cache.size() == 2*size
+
+
+def test_put_keeps_the_cache_within_budget(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put(cache.key(entry=0), np.zeros((100, 1)))
+    size = cache.size()
+    cache = ResultCache(str(tmp_path), budget=size)
+    old = cache.path(cache.key(entry=0))
+    os.utime(old, (1e9, 1e9))
+    cache.put(cache.key(entry=1), np.ones((100, 1)))
+    assert not os.path.exists(old)
+    assert cache.size() == size
+    cache.clear()
+    assert cache.entries() == []
@@ -0,0 +1,66 @@
+"""
+Tests of the column reductions in rheology.columns.
+"""
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+from rheology.lib import material_table, sigma_byerlee, sigma_creep
+from rheology.columns import Columns, elastic_thickness
+from rheology.columns import YOUNG_MODULUS, POISSON_RATIO
+from rheology.pipeline import transition_depths
+
+
+def test_crossings_interpolate_linear_curves():
+    # column 0: a - b = z - 12.5, one crossing downwards from negative
+    # column 1: a - b = 3 - |z - 20|, crossings at 17 and 23
+    depth = np.tile(np.arange(0.0, 41.0), 2)
+    x = np.repeat([0.0, 1.0], 41)
+    a = np.where(x == 0, depth - 12.5, 3 - np.abs(depth - 20))
+    b = np.zeros(len(depth))
+    b[5] = np.nan  # skipped
+    order = np.random.default_rng(3).permutation(len(depth))
+    cols = Columns(x[order], np.zeros(len(x)), depth[order])
+    column, z, direction = cols.crossings(a[order], b[order])
+    assert_array_equal(column, [0, 1, 1])
+    assert_allclose(z, [12.5, 17.0, 23.0], rtol=1e-14)
+    assert_array_equal(direction, [1, 1, -1])
+
+
+def test_transition_depths_find_envelope_kink():
+    mat = material_table().material('granite')
+    depth = np.linspace(0.0, 50.0, 501)
+    temp = 15*depth
+    out = transition_depths(depth, temp, mat, 1e-15)
+    assert len(out) == 1 and out[0, 3] == 1
+    # Byerlee's law equals the creep stress at the interpolated depth
+    z = out[0, 2]
+    byerlee = sigma_byerlee(mat, z*1e3, 'compression')
+    creep = sigma_creep(mat, 15*z + 273, 1e-15)
+    assert_allclose(byerlee, creep, rtol=1e-3)
+
+
+def test_elastic_thickness_of_uniform_plate():
+    h = 40e3
+    depth = np.linspace(0.0, h, 401)
+    strong = np.full(len(depth), 1e12)
+    cols = Columns(None, None, depth)
+    young = YOUNG_MODULUS/(1 - POISSON_RATIO**2)
+    for sign in (1, -1):
+        te = elastic_thickness(cols, -strong, strong, curvature=sign*1e-7)
+        assert_allclose(te, h, rtol=1e-5)
+        moment = sign*young*1e-7*h**3/12
+        te = elastic_thickness(cols, -strong, strong, moment=moment)
+        assert_allclose(te, h, rtol=1e-5)
+
+
+def test_moment_gives_te_of_its_curvature():
+    # compression and extension envelopes differ, so the sign matters
+    depth = np.linspace(0.0, 60e3, 601)
+    s_e = np.fmin(2e4*depth, 2e8*np.exp(-depth/20e3) + 1e6)
+    s_c = np.fmin(6e4*depth, 2e8*np.exp(-depth/20e3) + 1e6)
+    cols = Columns(None, None, depth)
+    young = YOUNG_MODULUS/(1 - POISSON_RATIO**2)
+    for curvature in (1e-7, -1e-7):
+        te = elastic_thickness(cols, -s_c, s_e, curvature=curvature)
+        moment = np.copysign(young*abs(curvature)*te**3/12, curvature)
+        assert_allclose(elastic_thickness(cols, -s_c, s_e, moment=moment),
+                        te, rtol=1e-6)
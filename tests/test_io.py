@@ -0,0 +1,52 @@
+"""
+Tests of reading and writing model files in rheology.io.
+"""
+import numpy as np
+import pytest
+from rheology.io import NpyWriter, text_to_npy, load_table, parse_text
+from rheology.pipeline import run_v2rhot, V2RHOT_FMT, V2RHOT_HEADER
+from rheology.bench import synthetic_v2rhot
+
+
+def test_npy_writer_appends_blocks(tmp_path):
+    data = np.random.default_rng(0).normal(size=(1000, 4))
+    path = str(tmp_path/'out.npy')
+    with NpyWriter(path) as writer:
+        for i in range(0, len(data), 300):
+            writer.write(data[i:i+300])
+    np.testing.assert_array_equal(np.load(path, mmap_mode='r'), data)
+
+
+def test_npy_input_gives_text_input_result(tmp_path):
+    text = str(tmp_path/'model.dat')
+    np.savetxt(text, synthetic_v2rhot(3000), delimiter=',', fmt=V2RHOT_FMT)
+    binary = str(tmp_path/'model.npy')
+    assert text_to_npy(text, binary, chunksize=700) == 3000
+    np.testing.assert_array_equal(load_table(binary), load_table(text))
+    for inputfile, name in ((text, 'text.npy'), (binary, 'binary.npy')):
+        run_v2rhot(inputfile, str(tmp_path/name), 'peridotite_dry', 1e-15,
+                   chunksize=700)
+    np.testing.assert_array_equal(np.load(str(tmp_path/'text.npy')),
+                                  np.load(str(tmp_path/'binary.npy')))
+    assert (tmp_path/'binary_meta.txt').exists()
+
+
+@pytest.mark.parametrize('usecols', [None, (2, 4)])
+def test_engines_skip_comments_alike(tmp_path, usecols):
+    pytest.importorskip('pyarrow')
+    data = synthetic_v2rhot(1000)
+    path = str(tmp_path/'model.dat')
+    with open(path, 'w') as f:
+        f.write('\n' + V2RHOT_HEADER + '\n#\n')
+        np.savetxt(f, data[:500], delimiter=',', fmt=V2RHOT_FMT)
+        f.write('# block 2\n\n')
+        np.savetxt(f, data[500:], delimiter=',', fmt=V2RHOT_FMT)
+    expected = np.loadtxt(path, delimiter=',', usecols=usecols)
+    for engine in ('numpy', 'pyarrow'):
+        np.testing.assert_array_equal(
+            parse_text(path, usecols=usecols, engine=engine), expected)
+    with open(path, 'a') as f:
+        f.write('1,2,3,4,5,6,7,8,9,10 # trailing comment\n')
+    np.testing.assert_array_equal(
+        parse_text(path, usecols=usecols, engine='pyarrow'),
+        parse_text(path, usecols=usecols, engine='numpy'))
@@ -0,0 +1,41 @@
+"""
+Tests of the fused kernel in rheology.jit.
+"""
+import numpy as np
+import pytest
+from rheology.lib import material_table, classify_density, compute_mixed
+from rheology.lib import LITMOD_DENSITY_RULES
+from rheology.jit import _fused_kernel, _run_fused, compute_fused
+from rheology.bench import synthetic_litmod
+
+
+@pytest.mark.parametrize('compute', [['dislocation', 'dorn'],
+                                     ['dislocation', 'diffusion', 'dorn'],
+                                     ['diffusion']])
+@pytest.mark.parametrize('log_viscosity', [False, True])
+def test_fused_kernel_matches_compute_mixed(compute, log_viscosity):
+    # the kernel as plain Python, so that it is tested without numba
+    table = material_table()
+    data = synthetic_litmod(1500)
+    mat_idx = classify_density(data[:, 6], LITMOD_DENSITY_RULES, table)
+    mat_idx[::97] = -1
+    z, T = data[:, 1]*1e3, data[:, 2] + 273
+    expected = compute_mixed(mat_idx, z, T, 1e-15, table, compute=compute,
+                             log_viscosity=log_viscosity)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        result = _run_fused(_fused_kernel, mat_idx, z, T, 1e-15, table,
+                            compute, log_viscosity)
+    for got, want in zip(result, expected):
+        np.testing.assert_allclose(got, want, rtol=1e-12)
+
+
+def test_compute_fused_numba_matches_compute_mixed():
+    pytest.importorskip('numba')
+    table = material_table()
+    data = synthetic_litmod(5000)
+    mat_idx = classify_density(data[:, 6], LITMOD_DENSITY_RULES, table)
+    z, T = data[:, 1]*1e3, data[:, 2] + 273
+    expected = compute_mixed(mat_idx, z, T, 1e-15, table)
+    result = compute_fused(mat_idx, z, T, 1e-15, table, backend='numba')
+    for got, want in zip(result, expected):
+        np.testing.assert_allclose(got, want, rtol=1e-12)
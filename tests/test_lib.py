@@ -0,0 +1,166 @@
+"""
+Tests of the compute core in rheology.lib.
+
+Run with python -m pytest from the repository root.
+"""
+import math
+import numpy as np
+import pytest
+from rheology.lib import materials, sigma_d, yield_strength_envelope
+from rheology.lib import material_table, classify_density, _match_rule
+from rheology.lib import yield_strength_sweep, log10_effective_viscosity
+from rheology.lib import compare_materials, unique_keys
+from rheology.lib import sigma_dislocation, sigma_diffusion, effective_viscosity
+
+R = 8.314472 # m2kg/s2/K/mol
+
+
+def reference_sigma_d(material, z, temp, strain_rate, mode):
+    """
+    Scalar sigma_d() of the original implementation with the default
+    creep processes, dislocation creep and Dorn's law.
+    """
+    f_f = material['f_f_c'] if mode == 'compression' else material['f_f_e']
+    s_byerlee = f_f*material['rho_b']*9.81*z*(1.0 - material['f_p'])
+    s_disloc = np.nan
+    if 'a_p' in material:
+        n = material['n']
+        s_disloc = (strain_rate/material['a_p'])**(1.0/n) * \
+            np.exp(material['q_p']/n/R/temp)
+    s_dorn = np.nan
+    if 'sigma_d' in material:
+        q_d, a_d = material['q_d'], material['a_d']
+        if q_d == 0 or a_d == 0:
+            s_dorn = np.nan
+        else:
+            s_dorn = material['sigma_d']*(1.0 - math.sqrt(
+                -1.0*R*temp/q_d*math.log(strain_rate/a_d)))
+            if s_dorn < 0.0:
+                s_dorn = 0
+    if (s_disloc > 200e6) and (s_dorn > 0):
+        s_creep = s_dorn
+    else:
+        s_creep = s_disloc
+    return min([s_byerlee, s_creep, np.nan])
+
+
+@pytest.mark.parametrize('material', materials(),
+                         ids=lambda material: material['name'])
+def test_sigma_d_matches_reference(material):
+    worst = 0.0
+    with np.errstate(over='ignore'):
+        for temp in np.linspace(300.0, 1800.0, 16):
+            for z in np.linspace(0.0, 200e3, 11):
+                for strain_rate in (1e-18, 1e-16, 1e-15, 1e-14, 1e-12):
+                    for mode in ('compression', 'extension'):
+                        expected = reference_sigma_d(material, z, temp,
+                                                     strain_rate, mode)
+                        got = sigma_d(material, z, temp, strain_rate,
+                                      mode=mode)
+                        if expected == 0:
+                            assert got == 0
+                        else:
+                            worst = max(worst,
+                                        abs(got - expected)/abs(expected))
+    assert worst <= 1e-13
+
+
+@pytest.mark.parametrize('material', materials(),
+                         ids=lambda material: material['name'])
+def test_yield_strength_envelope_matches_reference(material):
+    z, temp = np.meshgrid(np.linspace(0.0, 200e3, 11),
+                          np.linspace(300.0, 1800.0, 16))
+    with np.errstate(over='ignore'):
+        s_d_c, s_d_e = yield_strength_envelope(material, z, temp, 1e-15)
+        expected_c = [reference_sigma_d(material, zi, ti, 1e-15,
+                                        'compression')
+                      for zi, ti in zip(z.ravel(), temp.ravel())]
+        expected_e = [reference_sigma_d(material, zi, ti, 1e-15, 'extension')
+                      for zi, ti in zip(z.ravel(), temp.ravel())]
+    np.testing.assert_allclose(-s_d_c.ravel(), expected_c, rtol=1e-13)
+    np.testing.assert_allclose(s_d_e.ravel(), expected_e, rtol=1e-13)
+
+
+def test_classify_density_matches_rules():
+    table = material_table()
+    rng = np.random.default_rng(0)
+    grid = np.arange(2600.0, 3500.0, 50.0)
+    for _ in range(2000):
+        rules = list()
+        for _ in range(rng.integers(1, 6)):
+            name = table.names[rng.integers(len(table))]
+            if rng.random() < 0.5:
+                rules.append((name, float(rng.choice(grid))))
+            else:
+                lo, hi = np.sort(rng.choice(grid, 2))
+                if rng.random() < 0.2:
+                    lo = -np.inf
+                if rng.random() < 0.2:
+                    hi = np.inf
+                rules.append((name, (float(lo), float(hi))))
+        density = np.concatenate((grid, grid + 25.0, [np.nan],
+                                  rng.uniform(2500.0, 3600.0, 20)))
+        expected = [-1 if i < 0 else table.index(rules[i][0])
+                    for i in (_match_rule(rules, d) for d in density)]
+        np.testing.assert_array_equal(
+            classify_density(density, rules, table), expected)
+
+
+def test_sweep_matches_single_rates():
+    mat = material_table().material('peridotite_dry')
+    z = np.linspace(0.0, 150e3, 300)
+    T = 273 + z*1.1e-2
+    rates = [1e-17, 1e-15, 1e-13]
+    s_d_c, s_d_e, log_vis = yield_strength_sweep(mat, z, T, rates,
+                                                 log_viscosity=True)
+    assert s_d_c.shape == (len(z), len(rates))
+    for i, rate in enumerate(rates):
+        c, e = yield_strength_envelope(mat, z, T, rate)
+        np.testing.assert_allclose(s_d_c[:, i], c, rtol=1e-14)
+        np.testing.assert_allclose(s_d_e[:, i], e, rtol=1e-14)
+        np.testing.assert_allclose(
+            log_vis[:, i], log10_effective_viscosity(mat, T, rate),
+            rtol=1e-14)
+
+
+def test_compare_materials_matches_each_material():
+    table = material_table()
+    z = np.linspace(0.0, 150e3, 300)
+    T = 273 + z*1.1e-2
+    names = ['granite', 'diabase', 'peridotite_dry']
+    s_d_c, s_d_e, log_vis = compare_materials(z, T, 1e-15, names=names,
+                                              table=table, chunksize=70,
+                                              log_viscosity=True)
+    vis = compare_materials(z, T, 1e-15, names=names, table=table)[2]
+    for i, name in enumerate(names):
+        mat = table.material(name)
+        c, e = yield_strength_envelope(mat, z, T, 1e-15)
+        np.testing.assert_allclose(s_d_c[i], c, rtol=1e-14)
+        np.testing.assert_allclose(s_d_e[i], e, rtol=1e-14)
+        np.testing.assert_allclose(
+            log_vis[i], log10_effective_viscosity(mat, T, 1e-15), rtol=1e-14)
+    np.testing.assert_allclose(vis, 10**log_vis, rtol=1e-12)
+
+
+@pytest.mark.parametrize('law, keys', [
+    (sigma_dislocation, ('a_p', 'n', 'q_p')),
+    (effective_viscosity, ('a_p', 'n', 'q_p')),
+    (sigma_diffusion, ('a_f', 'q_f', 'a', 'm'))])
+def test_laws_accept_only_their_keys(law, keys):
+    material = material_table().material('peridotite_dry')
+    temp = np.linspace(600.0, 1600.0, 11)
+    minimal = dict((key, material[key]) for key in keys)
+    np.testing.assert_allclose(law(minimal, temp, 1e-15),
+                               law(material, temp, 1e-15), rtol=1e-14)
+
+
+@pytest.mark.parametrize('nkeys', [1, 2, 3])
+def test_unique_keys_restores_all_rows(nkeys):
+    rng = np.random.default_rng(1)
+    keys = [rng.integers(0, 4, 500).astype(float) for _ in range(nkeys)]
+    first, inverse = unique_keys(*keys)
+    rows = np.column_stack(keys)
+    assert len(first) == len(np.unique(rows, axis=0))
+    np.testing.assert_array_equal(rows[first][inverse], rows)
+    first, inverse = unique_keys(*[key[:0] for key in keys])
+    assert len(first) == len(inverse) == 0
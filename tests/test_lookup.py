@@ -0,0 +1,49 @@
+"""
+Tests of the tabulated envelopes in rheology.lookup.
+"""
+import numpy as np
+import pytest
+from rheology.lib import material_table, yield_strength_envelope
+from rheology.lib import log10_effective_viscosity
+from rheology.lookup import StrengthTable
+from rheology.pipeline import run_v2rhot, V2RHOT_FMT
+from rheology.io import load_table
+from rheology.bench import synthetic_v2rhot
+
+
+@pytest.mark.parametrize('name', ['granite', 'peridotite_dry'])
+def test_table_error_bounds_direct_evaluation(name):
+    mat = material_table().material(name)
+    table = StrengthTable(mat, 1e-15, (473.0, 1873.0))
+    rng = np.random.default_rng(0)
+    # includes points outside the table, which are evaluated directly
+    z = rng.uniform(0.0, 200e3, 20000)
+    T = rng.uniform(273.0, 2073.0, 20000)
+    s_d_c, s_d_e, log_vis = table(z, T)
+    c, e = yield_strength_envelope(mat, z, T, 1e-15)
+    bound = 2*table.max_rel_error['creep'] + 1e-13
+    np.testing.assert_allclose(s_d_c, c, rtol=bound)
+    np.testing.assert_allclose(s_d_e, e, rtol=bound)
+    np.testing.assert_allclose(10**log_vis,
+                               10**log10_effective_viscosity(mat, T, 1e-15),
+                               rtol=2*table.max_rel_error['viscosity'] + 1e-13)
+
+
+def test_v2rhot_lookup_reports_error(tmp_path):
+    inputfile = str(tmp_path/'model.dat')
+    np.savetxt(inputfile, synthetic_v2rhot(3000), delimiter=',',
+               fmt=V2RHOT_FMT)
+    expected = str(tmp_path/'direct.npy')
+    run_v2rhot(inputfile, expected, 'peridotite_dry', 1e-15)
+    output = str(tmp_path/'lookup.txt')
+    assert run_v2rhot(inputfile, output, 'peridotite_dry', 1e-15,
+                      chunksize=700, lookup=True) == (3000, 3000)
+    with open(output) as f:
+        assert any(line.startswith('#Lookup table max relative error')
+                   for line in f)
+    result = load_table(output)
+    np.testing.assert_allclose(result[:, 10:], np.load(expected)[:, 10:],
+                               rtol=1e-4, atol=1e-3)
+    with pytest.raises(ValueError):
+        run_v2rhot(inputfile, output, 'peridotite_dry', 1e-15, dedup=True,
+                   lookup=True)
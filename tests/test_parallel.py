@@ -0,0 +1,21 @@
+"""
+Tests of the process-pool execution in rheology.parallel.
+"""
+import numpy as np
+from rheology.lib import material_table, classify_density, compute_mixed
+from rheology.lib import LITMOD_DENSITY_RULES
+from rheology.parallel import compute_parallel
+from rheology.bench import synthetic_litmod
+
+
+def test_compute_parallel_matches_compute_mixed():
+    table = material_table()
+    data = synthetic_litmod(5000)
+    mat_idx = classify_density(data[:, 6], LITMOD_DENSITY_RULES, table)
+    z, T = data[:, 1]*1e3, data[:, 2] + 273
+    expected = compute_mixed(mat_idx, z, T, 1e-15, table)
+    result = compute_parallel(mat_idx, z, T, 1e-15, table, workers=2,
+                              chunksize=1000)
+    for got, want in zip(result[:3], expected):
+        np.testing.assert_array_equal(got, want)
+    assert result[3] == len(z)
@@ -0,0 +1,165 @@
+"""
+Tests of the pipelines in rheology.pipeline.
+"""
+import os
+import filecmp
+import numpy as np
+import pytest
+from rheology.pipeline import run_v2rhot, V2RHOT_FMT
+from rheology.pipeline import run_v2rhot_comparison, read_comparison
+from rheology.pipeline import strength_map, run_strength_map, run_litmod
+from rheology.lib import compare_materials
+from rheology.io import load_table, text_to_npy
+from rheology.bench import synthetic_v2rhot, synthetic_litmod
+
+# Options of run_v2rhot() that must give the output of a whole-file run
+V2RHOT_MODES = {'chunked': dict(chunksize=700),
+                'parallel': dict(chunksize=700, workers=2),
+                'passthrough': dict(chunksize=700, passthrough=True),
+                'parallel_passthrough': dict(chunksize=700, workers=2,
+                                             passthrough=True),
+                'dedup': dict(dedup=True),
+                'chunked_dedup': dict(chunksize=700, dedup=True),
+                'passthrough_dedup': dict(chunksize=700, passthrough=True,
+                                          dedup=True),
+                'fused': dict(fused=True),
+                'parallel_fused': dict(chunksize=700, workers=2, fused=True),
+                'passthrough_fused': dict(chunksize=700, passthrough=True,
+                                          fused=True)}
+# Options of run_litmod() that must give the output of a plain run
+LITMOD_MODES = {'dedup': dict(dedup=True),
+                'parallel': dict(workers=2),
+                'parallel_dedup': dict(workers=2, dedup=True),
+                'fused': dict(fused=True)}
+
+
+@pytest.fixture
+def v2rhot_file(tmp_path):
+    inputfile = str(tmp_path/'model.dat')
+    np.savetxt(inputfile, synthetic_v2rhot(3000), delimiter=',',
+               fmt=V2RHOT_FMT)
+    return inputfile
+
+
+def _run(inputfile, outdir, **options):
+    # the same output name in every directory, it is part of the header
+    outdir.mkdir(exist_ok=True)
+    outputfile = str(outdir/'out.txt')
+    result = run_v2rhot(inputfile, outputfile, 'peridotite_dry', 1e-15,
+                        **options)
+    return outputfile, result
+
+
+@pytest.mark.parametrize('mode', sorted(V2RHOT_MODES))
+def test_v2rhot_mode_gives_whole_file_output(v2rhot_file, tmp_path, mode):
+    expected, (nrows, nkeys) = _run(v2rhot_file, tmp_path/'whole')
+    assert nrows == nkeys == 3000
+    output, (nrows, nkeys) = _run(v2rhot_file, tmp_path/mode,
+                                  **V2RHOT_MODES[mode])
+    assert nrows == 3000 and 0 < nkeys <= nrows
+    assert filecmp.cmp(expected, output, shallow=False)
+
+
+def test_v2rhot_sweep_writes_every_rate(v2rhot_file, tmp_path):
+    rates = [1e-16, 1e-14]
+    sweep = str(tmp_path/'sweep.npy')
+    run_v2rhot(v2rhot_file, sweep, 'peridotite_dry', rates)
+    sweep = np.load(sweep)
+    assert sweep.shape == (3000, 10 + 3*len(rates))
+    for i, rate in enumerate(rates):
+        single = str(tmp_path/('single%d.npy' % i))
+        run_v2rhot(v2rhot_file, single, 'peridotite_dry', rate)
+        np.testing.assert_allclose(sweep[:, 10 + 3*i:13 + 3*i],
+                                   np.load(single)[:, 10:], rtol=1e-14)
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_comparison_streams_all_points(v2rhot_file, tmp_path, binary):
+    names = ['granite', 'olivine', 'peridotite_dry']
+    outdir = str(tmp_path/'comparison')
+    inputfile = v2rhot_file
+    if binary:
+        inputfile = str(tmp_path/'model.npy')
+        text_to_npy(v2rhot_file, inputfile, chunksize=1000)
+    assert run_v2rhot_comparison(inputfile, outdir, 1e-15,
+                                 materials=names, chunksize=700) == 3000
+    data = load_table(v2rhot_file)
+    expected = compare_materials(data[:, 2]*1e3, data[:, 4] + 273, 1e-15,
+                                 names=names, log_viscosity=True)
+    result = read_comparison(outdir)
+    assert result['materials'] == names
+    np.testing.assert_array_equal(result['points'], data[:, :3])
+    for name, values in zip(('dsigma_c', 'dsigma_e', 'viscosity'),
+                            expected):
+        np.testing.assert_array_equal(result[name], values.T)
+
+
+def test_strength_map_integrates_every_column(tmp_path):
+    # three (x, y) columns 0-30 km deep, rows shuffled
+    x, y, depth = (a.ravel() for a in np.meshgrid(
+        [0.0, 1.0, 2.0], [5.0], np.linspace(0.0, 30.0, 61), indexing='ij'))
+    rng = np.random.default_rng(2)
+    order = rng.permutation(len(x))
+    x, y, depth = x[order], y[order], depth[order]
+    dsigma_c = -1e6*(1 + x)
+    dsigma_e = 1e3*depth*(1 + x)
+    out = strength_map(x, y, depth, dsigma_c, dsigma_e)
+    np.testing.assert_array_equal(out[:, :2], [[0, 5], [1, 5], [2, 5]])
+    # constant stress times 30 km, linear stress 1e3 Pa/km*z**2/2
+    columns = np.array([1.0, 2.0, 3.0])
+    np.testing.assert_allclose(out[:, 2], -30e9*columns, rtol=1e-12)
+    np.testing.assert_allclose(out[:, 3], 1e3*30**2/2*1e3*columns,
+                               rtol=1e-12)
+
+
+def test_run_strength_map_reads_v2rhot_output(v2rhot_file, tmp_path):
+    result = str(tmp_path/'out.npy')
+    run_v2rhot(v2rhot_file, result, 'peridotite_dry', 1e-15)
+    mapfile = str(tmp_path/'map.npy')
+    out = np.load(result)
+    expected = strength_map(out[:, 0], out[:, 1], out[:, 2], out[:, 10],
+                            out[:, 11])
+    assert run_strength_map(result, mapfile) == len(expected) == 15
+    np.testing.assert_array_equal(np.load(mapfile), expected)
+
+
+@pytest.mark.parametrize('mode', sorted(LITMOD_MODES))
+def test_litmod_mode_gives_plain_output(tmp_path, mode):
+    inputfile = str(tmp_path/'profile.dat')
+    data = synthetic_litmod(3000)
+    data[::50, 6] = 1.0  # no rule matches
+    np.savetxt(inputfile, data, fmt='%10.3f')
+    expected = str(tmp_path/'plain.dat')
+    assert run_litmod(inputfile, expected, 1e-16) == (3000, 60)
+    output = str(tmp_path/(mode + '.dat'))
+    assert run_litmod(inputfile, output, 1e-16,
+                      **LITMOD_MODES[mode]) == (3000, 60)
+    assert filecmp.cmp(expected, output, shallow=False)
+
+
+def test_v2rhot_cache_hit_gives_computed_output(v2rhot_file, tmp_path):
+    cache = str(tmp_path/'cache')
+    expected, (nrows, nkeys) = _run(v2rhot_file, tmp_path/'miss',
+                                    chunksize=700, cache=cache)
+    assert nrows == nkeys == 3000
+    output, (nrows, nkeys) = _run(v2rhot_file, tmp_path/'hit',
+                                  chunksize=700, cache=cache)
+    assert (nrows, nkeys) == (3000, 0)
+    assert filecmp.cmp(expected, output, shallow=False)
+    # another strain rate is a miss
+    assert run_v2rhot(v2rhot_file, str(tmp_path/'other.txt'),
+                      'peridotite_dry', 1e-16, cache=cache) == (3000, 3000)
+
+
+def test_litmod_cache_hit_gives_computed_output(tmp_path):
+    inputfile = str(tmp_path/'profile.dat')
+    data = synthetic_litmod(3000)
+    data[::50, 6] = 1.0
+    np.savetxt(inputfile, data, fmt='%10.3f')
+    cache = str(tmp_path/'cache')
+    expected = str(tmp_path/'miss.dat')
+    assert run_litmod(inputfile, expected, 1e-16, cache=cache) == (3000, 60)
+    assert len(os.listdir(cache)) == 1
+    output = str(tmp_path/'hit.dat')
+    assert run_litmod(inputfile, output, 1e-16, cache=cache) == (3000, 60)
+    assert filecmp.cmp(expected, output, shallow=False)